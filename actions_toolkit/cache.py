@@ -44,8 +44,8 @@ def get_upload_options(**copy) -> UploadOptions:
     Returns a copy of the upload options with defaults filled in.
     """
     result = UploadOptions(**copy)
-    core.debug(f'Upload concurrency: {result.upload_concurrency}')
-    core.debug(f'Upload chunk size: {result.upload_chunk_size}')
+    core.lazy_debug('Upload concurrency: %s', result.upload_concurrency)
+    core.lazy_debug('Upload chunk size: %s', result.upload_chunk_size)
     return result
 
 
@@ -54,9 +54,9 @@ def get_download_options(**copy) -> DownloadOptions:
     Returns a copy of the download options with defaults filled in.
     """
     result = DownloadOptions(**copy)
-    core.debug(f'Use Azure SDK: {result.use_azure_sdk}')
-    core.debug(f'Download concurrency: {result.download_concurrency}')
-    core.debug(f'Request timeout (ms): {result.timeout_in_ms}')
+    core.lazy_debug('Use Azure SDK: %s', result.use_azure_sdk)
+    core.lazy_debug('Download concurrency: %s', result.download_concurrency)
+    core.lazy_debug('Request timeout (ms): %s', result.timeout_in_ms)
     return result
 
 
@@ -65,7 +65,7 @@ def get_cache_api_url(resource: str) -> str:
     if not base_url:
         raise Exception('Cache Service Url not found, unable to restore cache.')
     url = f'{base_url}_apis/artifactcache/{resource}'
-    core.debug(f'Resource Url: {url}')
+    core.lazy_debug('Resource Url: %s', url)
     return url
 
 
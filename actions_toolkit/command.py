@@ -1,10 +1,225 @@
+import atexit
 import os
+import queue
 import sys
+import threading
 
+from actions_toolkit.secret_masker import has_secrets, mask_secrets
 from actions_toolkit.utils import to_command_value
 
 
-def issue_command(command: str, properties: dict, message):
+class CommandSink:
+    """
+    Destination for workflow commands and log lines.
+
+    The default sink writes every line straight to `sys.stdout`.
+    """
+
+    def write(self, data: str, droppable: bool = False):
+        """
+        :param droppable: whether data is plain log output that a sink shedding load may drop
+        """
+        sys.stdout.write(data)
+
+    def flush(self):
+        sys.stdout.flush()
+
+    def close(self):
+        self.flush()
+
+    def run(self, func, *args):
+        """
+        Runs an output operation other than a stdout write, such as a file command append,
+        in order with the lines written to this sink.
+        """
+        func(*args)
+
+
+class BufferedCommandSink(CommandSink):
+    """
+    Collects lines in memory and writes them to `sys.stdout` in batches.
+
+    A batch is written once it holds `max_bytes` characters or once `max_delay`
+    seconds have passed since the first buffered line, whichever comes first.
+    Pending output is always written at interpreter exit.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024, max_delay: float = 0.5):
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self._buffer = []
+        self._size = 0
+        self._timer = None
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def write(self, data: str, droppable: bool = False):
+        with self._lock:
+            self._buffer.append(data)
+            self._size += len(data)
+            if self._size < self.max_bytes and self.max_delay > 0:
+                if self._timer is None:
+                    # Writes the batch even if nothing else is written in the meantime
+                    self._timer = threading.Timer(self.max_delay, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._buffer:
+                data = ''.join(self._buffer)
+                self._buffer.clear()
+                self._size = 0
+                sys.stdout.write(data)
+        sys.stdout.flush()
+
+    def close(self):
+        self.flush()
+        atexit.unregister(self.flush)
+
+
+class ThreadedCommandSink(CommandSink):
+    """
+    Hands output to a background thread through a bounded queue.
+
+    Lines and file command operations are performed by the thread in the order
+    they were submitted. When the queue is full, `on_full` decides what happens
+    to a new log line: 'block' waits for room, 'drop' discards it. Other workflow
+    commands, such as add-mask or annotations, and file command operations always wait. Errors raised by the thread are re-raised by the next
+    `flush` or `close`, and the queue is drained at interpreter exit.
+    """
+
+    def __init__(self, maxsize: int = 10000, on_full: str = 'block'):
+        if on_full not in ('block', 'drop'):
+            raise ValueError(f'Unknown queue full policy: {on_full}')
+        self.on_full = on_full
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize)
+        self._errors = []
+        self._thread = threading.Thread(target=self._work, name='actions-toolkit-output', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _work(self):
+        while True:
+            items = [self._queue.get()]
+            # Take whatever else is already waiting so consecutive lines cost one write
+            while len(items) < 1024:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = False
+            lines = []
+            for item in items:
+                if isinstance(item, str):
+                    lines.append(item)
+                    continue
+                if lines:
+                    self._call(sys.stdout.write, ''.join(lines))
+                    lines = []
+                if item is None:
+                    stop = True
+                    break
+                self._call(item[0], *item[1])
+            if lines:
+                self._call(sys.stdout.write, ''.join(lines))
+            for _ in items:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _call(self, func, *args):
+        try:
+            func(*args)
+        except Exception as e:
+            self._errors.append(e)
+
+    def write(self, data: str, droppable: bool = False):
+        if droppable and self.on_full == 'drop':
+            try:
+                self._queue.put_nowait(data)
+            except queue.Full:
+                self.dropped += 1
+        else:
+            self._queue.put(data)
+
+    def run(self, func, *args):
+        self._queue.put((func, args))
+
+    def flush(self):
+        if self._thread.is_alive():
+            self._queue.join()
+        sys.stdout.flush()
+        if self._errors:
+            errors, self._errors = self._errors, []
+            raise errors[0]
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        atexit.unregister(self.close)
+        self.flush()
+
+
+_sink = CommandSink()
+
+
+def get_command_sink() -> CommandSink:
+    return _sink
+
+
+def set_command_sink(sink: CommandSink = None) -> CommandSink:
+    """
+    Replaces the sink used by `issue_command` and `core.info`.
+
+    Pending output of the previous sink is flushed first.
+    :param sink: the new sink, or None to restore unbuffered stdout writes
+    :return: the previous sink
+    """
+    global _sink
+    previous = _sink
+    try:
+        previous.close()
+    finally:
+        # Even when closing raises an error of a background writer, which has stopped by then
+        _sink = sink or CommandSink()
+    return previous
+
+
+def flush_commands():
+    """Writes out any command output held back by the current sink"""
+    _sink.flush()
+
+
+def write_line(line: str):
+    if has_secrets():
+        line = mask_secrets(line)
+    _sink.write(line + os.linesep, droppable=True)
+
+
+# Commands whose values are handed to the runner or to later steps rather than printed
+_UNMASKED_COMMANDS = frozenset({'add-mask', 'set-output', 'set-env', 'save-state'})
+
+
+def format_command(command: str, properties: dict, message) -> str:
+    """
+    Formats a command, masking registered secrets in its message and properties.
+    """
+    if has_secrets() and command not in _UNMASKED_COMMANDS:
+        message = mask_secrets(to_command_value(message))
+        if properties:
+            properties = {k: mask_secrets(v) if isinstance(v, str) else v for k, v in properties.items()}
+    return str(Command(command, properties, message))
+
+
+def issue_command(command: str, properties: dict, message, droppable: bool = False):
     """
     Commands
 
@@ -14,9 +229,10 @@ def issue_command(command: str, properties: dict, message):
     Examples:
         ::warning::This is the message
         ::set-env name=MY_VAR::some value
+
+    Only log commands such as debug may be droppable: a dropped add-mask would leave a secret unmasked.
     """
-    cmd = Command(command, properties, message)
-    sys.stdout.write(str(cmd) + os.linesep)
+    _sink.write(format_command(command, properties, message) + os.linesep, droppable=droppable)
 
 
 def issue(name: str, message: str = ''):
@@ -46,11 +262,46 @@ class Command:
         return cmd_str
 
 
+# Each replacement only runs when its character is present: the `in` scans are
+# much cheaper than a `replace` that finds nothing, and a value without any
+# escapable character is returned unchanged without being copied.
+
 def escape_data(s) -> str:
-    return to_command_value(s).replace('%', '%25') \
-        .replace('\r', '%0D').replace('\n', '%0A')
+    s = to_command_value(s)
+    if '%' in s:
+        s = s.replace('%', '%25')
+    if '\r' in s:
+        s = s.replace('\r', '%0D')
+    if '\n' in s:
+        s = s.replace('\n', '%0A')
+    return s
 
 
 def escape_property(s) -> str:
-    return to_command_value(s).replace('%', '%25').replace('\r', '%0D') \
-        .replace('\n', '%0A').replace(':', '%3A').replace(',', '%2C')
+    s = escape_data(s)
+    if ':' in s:
+        s = s.replace(':', '%3A')
+    if ',' in s:
+        s = s.replace(',', '%2C')
+    return s
+
+
+def unescape_data(s: str) -> str:
+    if '%' not in s:
+        return s
+    if '%0D' in s:
+        s = s.replace('%0D', '\r')
+    if '%0A' in s:
+        s = s.replace('%0A', '\n')
+    # Last, so that an escaped `%` is not read as the start of another escape
+    return s.replace('%25', '%')
+
+
+def unescape_property(s: str) -> str:
+    if '%' not in s:
+        return s
+    if '%3A' in s:
+        s = s.replace('%3A', ':')
+    if '%2C' in s:
+        s = s.replace('%2C', ',')
+    return unescape_data(s)
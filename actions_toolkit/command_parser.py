@@ -0,0 +1,90 @@
+from collections import namedtuple
+from typing import Iterable, Iterator, Optional
+
+from actions_toolkit.command import CMD_STRING, unescape_data, unescape_property
+
+CommandRecord = namedtuple('CommandRecord', ['command', 'properties', 'message'])
+FileCommandRecord = namedtuple('FileCommandRecord', ['name', 'value'])
+
+
+def parse_command_line(line: str) -> Optional[CommandRecord]:
+    """
+    Decodes a single `::name key=value,key=value::message` line.
+    :return: the command, or None if the line is not a workflow command
+    """
+    line = line.lstrip()
+    if not line.startswith(CMD_STRING):
+        return None
+    end = line.find(CMD_STRING, 2)
+    if end == -1:
+        return None
+    message = line[end + 2:].rstrip('\r\n')
+
+    head = line[2:end]
+    space = head.find(' ')
+    properties = {}
+    if space == -1:
+        command = head
+    else:
+        command = head[:space]
+        for pair in head[space + 1:].split(','):
+            key, sep, value = pair.partition('=')
+            if sep and key:
+                properties[key] = unescape_property(value)
+    if not command:
+        return None
+    return CommandRecord(command, properties, unescape_data(message))
+
+
+def parse_commands(lines: Iterable[str]) -> Iterator[CommandRecord]:
+    """
+    Decodes the workflow commands of a log, skipping every other line.
+    :param lines: any iterable of lines, such as a file opened in text mode; it is read lazily
+    """
+    for line in lines:
+        if CMD_STRING in line:
+            record = parse_command_line(line)
+            if record is not None:
+                yield record
+
+
+def parse_file_commands(lines: Iterable[str]) -> Iterator[FileCommandRecord]:
+    """
+    Decodes the `name<<delimiter` blocks and `name=value` lines of a GITHUB_ENV,
+    GITHUB_OUTPUT or GITHUB_STATE file.
+    :param lines: any iterable of lines, such as a file opened in text mode with newline=''; it is read lazily
+    """
+    name = None
+    delimiter = None
+    parts = []
+    for line in lines:
+        if name is not None:
+            if line.rstrip('\r\n') == delimiter:
+                value = ''.join(parts)
+                # The line break before the delimiter is not part of the value
+                if value.endswith('\r\n'):
+                    value = value[:-2]
+                elif value.endswith('\n'):
+                    value = value[:-1]
+                yield FileCommandRecord(name, value)
+                name = None
+                parts = []
+            else:
+                parts.append(line)
+            continue
+
+        stripped = line.rstrip('\r\n')
+        if not stripped:
+            continue
+        heredoc = stripped.find('<<')
+        equals = stripped.find('=')
+        if heredoc != -1 and (equals == -1 or heredoc < equals):
+            name, delimiter = stripped[:heredoc], stripped[heredoc + 2:]
+            if not name or not delimiter:
+                raise ValueError(f'Invalid file command line: {stripped}')
+        elif equals > 0:
+            yield FileCommandRecord(stripped[:equals], stripped[equals + 1:])
+        else:
+            raise ValueError(f'Invalid file command line: {stripped}')
+    if name is not None:
+        raise ValueError(f'Matching delimiter not found: {delimiter}')
@@ -1,11 +1,17 @@
 import enum
 import os
+import re
 import sys
-from typing import List, Union
-
-from actions_toolkit.command import issue_command, issue
-from actions_toolkit.file_command import issue_file_command, prepare_key_value_message
-from actions_toolkit.oidc_utils import OidcClient
+from collections import OrderedDict
+from typing import Iterable, Iterator, List, Union
+
+from actions_toolkit.command import issue_command, issue, flush_commands, write_line, get_command_sink, \
+    format_command, set_command_sink, ThreadedCommandSink
+from actions_toolkit.file_command import issue_file_command, prepare_key_value_message, prepare_key_value_messages, \
+    issue_file_command_stream
+from actions_toolkit.inputs import Inputs, load_inputs
+from actions_toolkit.oidc_utils import get_id_token_cache
+from actions_toolkit.secret_masker import is_registered, register_secret, mask_secrets
 from actions_toolkit.utils import to_command_value, to_command_properties, AnnotationProperties
 
 
@@ -20,6 +26,10 @@ class InputOptions:
         self.trim_whitespace = trim_whitespace
 
 
+# GitHub keeps at most this many annotations of each level for a single step
+ANNOTATION_LIMIT = 10
+
+
 @enum.unique
 class ExitCode(enum.IntEnum):
     """The code to exit an action"""
@@ -51,13 +61,46 @@ def export_variable(name: str, val):
     issue_command('set-env', dict(name=name), converted_val)
 
 
+def export_variables(variables: dict):
+    """
+    Sets several env variables for this action and future actions_toolkit in the job with a single file append
+    :param variables: mapping of variable names to values. Non-string values will be converted via json.dumps
+    :return: void
+    """
+    if not variables:
+        return
+    converted = {name: to_command_value(val) for name, val in variables.items()}
+    os.environ.update(converted)
+
+    file_path = os.getenv('GITHUB_ENV')
+    if file_path:
+        return issue_file_command('ENV', prepare_key_value_messages(converted))
+    for name, converted_val in converted.items():
+        issue_command('set-env', dict(name=name), converted_val)
+
+
+def export_variable_from(name: str, source):
+    """
+    Sets env variable for future actions_toolkit in the job, streaming the value from a file, buffer or chunks.
+    With GITHUB_ENV set the value is not read into memory, so it is not added to this process' environment.
+    :param name: the name of the variable to set
+    :param source: an os.PathLike file, a bytes or bytearray buffer, or an iterable of str/bytes chunks
+    :return: void
+    """
+    if os.getenv('GITHUB_ENV'):
+        return issue_file_command_stream('ENV', name, source)
+    export_variable(name, _read_source(source))
+
+
 def set_secret(secret: str):
     """
-    Registers a secret which will get masked from logs
+    Registers a secret which will get masked from logs.
+    The toolkit also masks it itself in everything it writes to the log afterwards.
     :param secret: value of the secret
     :return: void
     """
     issue_command('add-mask', {}, secret)
+    register_secret(to_command_value(secret))
 
 
 def add_path(input_path: str):
@@ -97,6 +140,57 @@ def get_multiline_input(name: str, **options) -> List[str]:
     return [x.strip() for x in inputs] if options.trim_whitespace else inputs
 
 
+_WORD = re.compile(r'\S+')
+
+
+def iter_multiline_input(name: str, separator: str = '\n', dedupe: bool = False, **options) -> Iterator[str]:
+    """
+    Lazily yields the non-empty entries of a list input, without building intermediate lists.
+    Unless trim_whitespace is set to false, each entry is also trimmed.
+    :param name: name of the input
+    :param separator: the string between entries, '\n' by default. None splits on any whitespace
+    :param dedupe: whether to skip entries that were already yielded
+    """
+    if separator == '':
+        raise ValueError('Empty separator')
+    options = InputOptions(**options)
+    name = name.replace(' ', '_').upper()
+    val = os.getenv(f'INPUT_{name}', '')
+    if options.required and not val:
+        raise Exception(f'Input required and not supplied: {name}')
+    return _iter_entries(val, separator, dedupe, options.trim_whitespace)
+
+
+def _iter_entries(val: str, separator: str, dedupe: bool, trim_whitespace: bool) -> Iterator[str]:
+    seen = set() if dedupe else None
+    if separator is None:
+        entries = (m.group() for m in _WORD.finditer(val))
+    else:
+        entries = _split(val, separator)
+    for entry in entries:
+        if trim_whitespace:
+            entry = entry.strip()
+        if not entry:
+            continue
+        if seen is not None:
+            if entry in seen:
+                continue
+            seen.add(entry)
+        yield entry
+
+
+def _split(val: str, separator: str) -> Iterator[str]:
+    start = 0
+    step = len(separator)
+    while True:
+        end = val.find(separator, start)
+        if end == -1:
+            yield val[start:]
+            return
+        yield val[start:end]
+        start = end + step
+
+
 def get_boolean_input(name: str, **options) -> bool:
     """
     Gets the input value of the boolean type in the YAML 1.2 "core schema" specification.
@@ -123,10 +217,49 @@ def set_output(name: str, value):
     file_path = os.getenv('GITHUB_OUTPUT') or ''
     if file_path:
         return issue_file_command('OUTPUT', prepare_key_value_message(name, value))
-    sys.stdout.write(os.linesep)
+    write_line('')
     issue_command('set-output', dict(name=name), to_command_value(value))
 
 
+def set_outputs(outputs: dict):
+    """
+    Sets the values of several outputs with a single file append.
+    :param outputs: mapping of output names to values. Non-string values will be converted via json.dumps
+    :return: void
+    """
+    if not outputs:
+        return
+    file_path = os.getenv('GITHUB_OUTPUT') or ''
+    if file_path:
+        return issue_file_command('OUTPUT', prepare_key_value_messages(outputs))
+    for name, value in outputs.items():
+        write_line('')
+        issue_command('set-output', dict(name=name), to_command_value(value))
+
+
+def set_output_from(name: str, source):
+    """
+    Sets the value of an output, streaming it from a file, buffer or chunks instead of building it in memory.
+    :param name: name of the output to set
+    :param source: an os.PathLike file, a bytes or bytearray buffer, or an iterable of str/bytes chunks
+    :return: void
+    """
+    if os.getenv('GITHUB_OUTPUT'):
+        return issue_file_command_stream('OUTPUT', name, source)
+    set_output(name, _read_source(source))
+
+
+def _read_source(source) -> str:
+    if isinstance(source, os.PathLike):
+        with open(source, 'r', encoding='utf8', newline='') as f:
+            return f.read()
+    if isinstance(source, (bytes, bytearray)):
+        return source.decode('utf8')
+    if isinstance(source, str):
+        return source
+    return ''.join(chunk.decode('utf8') if isinstance(chunk, bytes) else chunk for chunk in source)
+
+
 def set_command_echo(enabled: bool):
     """
     Enables or disables the echoing of commands into stdout for the rest of the step.
@@ -147,6 +280,7 @@ def set_failed(message: Union[str, Exception]):
     :return: void
     """
     error(message)
+    flush_commands()
     sys.exit(ExitCode.failure.value)
 
 
@@ -161,7 +295,41 @@ def debug(message: str):
     :param message: debug message
     :return: void
     """
-    issue_command('debug', {}, message)
+    issue_command('debug', {}, message, droppable=True)
+
+
+_step_debug = None
+_lazy_debug_always = False
+
+
+def lazy_debug(message, *args):
+    """
+    Writes debug message to user log only when Actions Step Debug is on.
+    Whether it is on is read once per process; when it is off the message is neither formatted nor written.
+    :param message: debug message, a %-style format string for args, or a callable returning the message
+    :param args: arguments for the format string
+    :return: void
+    """
+    global _step_debug
+    if _step_debug is None:
+        _step_debug = is_debug()
+    if not _step_debug and not _lazy_debug_always:
+        return
+    if callable(message):
+        message = message()
+    elif args:
+        message = message % args
+    issue_command('debug', {}, message, droppable=True)
+
+
+def set_lazy_debug_always(enabled: bool):
+    """
+    Makes lazy_debug write its messages even when Actions Step Debug is off, as debug does.
+    :param enabled: whether to always write lazy debug messages
+    :return: void
+    """
+    global _lazy_debug_always
+    _lazy_debug_always = enabled
 
 
 def error(message: Union[str, Exception], **properties):
@@ -197,13 +365,104 @@ def notice(message: Union[str, Exception], **properties):
     issue_command('notice', to_command_properties(properties), message)
 
 
+def annotate_many(findings: Iterable[dict], limit: int = ANNOTATION_LIMIT,
+                  max_tracked: int = 65536, batch_size: int = 256) -> int:
+    """
+    Adds annotations for a stream of findings.
+
+    Each finding is a dict with a `message`, an optional `level` (`error`, `warning` or `notice`,
+    defaults to `warning`) and the optional keys of AnnotationProperties. Findings are consumed lazily,
+    duplicates of the same (level, file, line, column, message) are dropped, and the lines are written
+    to the command sink in batches.
+    :param findings: iterable of findings, e.g. a generator over a SARIF report
+    :param limit: maximum number of annotations per level, findings beyond it are skipped without being
+                  formatted and iteration stops once every level is full. None disables the limit
+    :param max_tracked: maximum number of findings remembered for deduplication
+    :param batch_size: number of lines written to the sink at once
+    :return: the number of annotations written
+    """
+    counts = {'error': 0, 'warning': 0, 'notice': 0}
+    full = 0
+    # file -> findings seen in that file, least recently used file first
+    seen = OrderedDict()
+    tracked = 0
+    lines = []
+    written = 0
+    sink = get_command_sink()
+    for finding in findings:
+        level = finding.get('level') or 'warning'
+        if level not in counts:
+            raise ValueError(f'Unknown annotation level: {level}')
+        if limit is not None and counts[level] >= limit:
+            continue
+
+        file = finding.get('file')
+        key = (level, finding.get('start_line'), finding.get('start_column'), finding['message'])
+        keys = seen.get(file)
+        if keys is None:
+            keys = seen[file] = set()
+        else:
+            seen.move_to_end(file)
+        if key in keys:
+            continue
+        keys.add(key)
+        tracked += 1
+        while tracked > max_tracked:
+            tracked -= len(seen.popitem(last=False)[1])
+
+        message = finding['message']
+        if isinstance(message, Exception):
+            message = f'Error: {str(message)}'
+        properties = {
+            'title': finding.get('title'),
+            'file': file,
+            'line': finding.get('start_line'),
+            'endLine': finding.get('end_line'),
+            'col': finding.get('start_column'),
+            'endColumn': finding.get('end_column')
+        }
+        if all(v is None for v in properties.values()):
+            properties = {}
+        lines.append(format_command(level, properties, message) + os.linesep)
+        written += 1
+        if len(lines) >= batch_size:
+            sink.write(''.join(lines))
+            lines.clear()
+
+        counts[level] += 1
+        if limit is not None and counts[level] == limit:
+            full += 1
+            if full == len(counts):
+                break
+    if lines:
+        sink.write(''.join(lines))
+    return written
+
+
 def info(message: str):
     """
     Writes info to log with console.log.
     :param message: info message
     :return: void
     """
-    sys.stdout.write(message + os.linesep)
+    write_line(message)
+
+
+def enable_async_output(maxsize: int = 10000, on_full: str = 'block'):
+    """
+    Moves log and file command writes to a background thread, so that a blocked stdout does not stall the action.
+    Output keeps its order and is drained by set_failed, flush_commands and at interpreter exit.
+    :param maxsize: maximum number of writes waiting in the queue
+    :param on_full: what to do with an info or debug line when the queue is full, 'block' to wait or 'drop' to discard it
+    :return: void
+    """
+    set_command_sink(ThreadedCommandSink(maxsize, on_full))
+
+
+def disable_async_output():
+    """Drains the background writer and goes back to writing output directly."""
+    if isinstance(get_command_sink(), ThreadedCommandSink):
+        set_command_sink(None)
 
 
 def start_group(name: str):
@@ -220,6 +479,7 @@ def start_group(name: str):
 def end_group():
     """End an output group."""
     issue('endgroup')
+    flush_commands()
 
 
 async def group(name: str, fn):
@@ -255,6 +515,33 @@ def save_state(name: str, value):
     issue_command('save-state', dict(name=name), to_command_value(value))
 
 
+def save_states(states: dict):
+    """
+    Saves several states for current action with a single file append.
+    :param states: mapping of state names to values. Non-string values will be converted via json.dumps
+    :return: void
+    """
+    if not states:
+        return
+    file_path = os.getenv('GITHUB_STATE') or ''
+    if file_path:
+        return issue_file_command('STATE', prepare_key_value_messages(states))
+    for name, value in states.items():
+        issue_command('save-state', dict(name=name), to_command_value(value))
+
+
+def save_state_from(name: str, source):
+    """
+    Saves state for current action, streaming the value from a file, buffer or chunks.
+    :param name: name of the state to store
+    :param source: an os.PathLike file, a bytes or bytearray buffer, or an iterable of str/bytes chunks
+    :return: void
+    """
+    if os.getenv('GITHUB_STATE'):
+        return issue_file_command_stream('STATE', name, source)
+    save_state(name, _read_source(source))
+
+
 def get_state(name: str) -> str:
     """
     Gets the value of an state set by this action's main execution.
@@ -265,8 +552,24 @@ def get_state(name: str) -> str:
 
 
 def get_id_token(aud: str = None) -> str:
-    id_token = OidcClient.get_id_token(aud)
-    set_secret(id_token)
+    """
+    Gets an ID token from the GitHub OIDC provider.
+    Tokens are reused for the same audience until shortly before they expire, and each one is masked once.
+    :param aud: the audience of the token, optional
+    """
+    return _mask_id_token(get_id_token_cache().get(aud))
+
+
+async def get_id_token_async(aud: str = None) -> str:
+    """
+    Gets an ID token from the GitHub OIDC provider without blocking the event loop, see get_id_token.
+    """
+    return _mask_id_token(await get_id_token_cache().get_async(aud))
+
+
+def _mask_id_token(id_token: str) -> str:
+    if not is_registered(to_command_value(id_token)):
+        set_secret(id_token)
     return id_token
 
 
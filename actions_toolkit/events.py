@@ -0,0 +1,241 @@
+from typing import Type
+
+
+class Field:
+    """A value of the payload, read from it on every access"""
+    __slots__ = ('key',)
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        return obj._data.get(self.key)
+
+
+class Nested:
+    """
+    An object, or list of objects with many=True, of the payload wrapped in a model on first access.
+    The model is kept in the slot named after the attribute with a leading underscore.
+    """
+    __slots__ = ('key', 'model', 'many', 'slot')
+
+    def __init__(self, key: str, model: Type['Model'], many: bool = False):
+        self.key = key
+        self.model = model
+        self.many = many
+        self.slot = None
+
+    def __set_name__(self, owner, name):
+        self.slot = f'_{name}'
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        try:
+            return getattr(obj, self.slot)
+        except AttributeError:
+            pass
+        value = obj._data.get(self.key)
+        if value is not None:
+            model = self.model
+            value = tuple(model(item) for item in value) if self.many else model(value)
+        elif self.many:
+            value = ()
+        setattr(obj, self.slot, value)
+        return value
+
+
+class Model:
+    """
+    Read-only view over an object of a webhook payload.
+
+    Nothing is copied: plain values are read from the underlying dict when accessed,
+    and nested objects are wrapped in their model the first time they are accessed.
+    """
+    __slots__ = ('_data',)
+
+    def __init__(self, data: dict = None):
+        self._data = data or {}
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self._data!r})'
+
+    @property
+    def raw(self) -> dict:
+        """The underlying payload object"""
+        return self._data
+
+    def get(self, key: str, default=None):
+        """Gets a key of the underlying payload object that has no attribute"""
+        return self._data.get(key, default)
+
+
+class User(Model):
+    __slots__ = ()
+    login = Field('login')
+    id = Field('id')
+    type = Field('type')
+    html_url = Field('html_url')
+
+
+class Repository(Model):
+    __slots__ = ('_owner',)
+    id = Field('id')
+    name = Field('name')
+    full_name = Field('full_name')
+    owner = Nested('owner', User)
+    private = Field('private')
+    fork = Field('fork')
+    default_branch = Field('default_branch')
+    html_url = Field('html_url')
+    clone_url = Field('clone_url')
+
+
+class Label(Model):
+    __slots__ = ()
+    id = Field('id')
+    name = Field('name')
+    color = Field('color')
+
+
+class GitUser(Model):
+    __slots__ = ()
+    name = Field('name')
+    email = Field('email')
+    username = Field('username')
+
+
+class Commit(Model):
+    __slots__ = ('_author', '_committer')
+    id = Field('id')
+    tree_id = Field('tree_id')
+    message = Field('message')
+    timestamp = Field('timestamp')
+    url = Field('url')
+    author = Nested('author', GitUser)
+    committer = Nested('committer', GitUser)
+    added = Field('added')
+    removed = Field('removed')
+    modified = Field('modified')
+
+
+class Ref(Model):
+    """The head or base of a pull request"""
+    __slots__ = ('_user', '_repo')
+    label = Field('label')
+    ref = Field('ref')
+    sha = Field('sha')
+    user = Nested('user', User)
+    repo = Nested('repo', Repository)
+
+
+class PullRequest(Model):
+    __slots__ = ('_user', '_head', '_base', '_labels')
+    id = Field('id')
+    number = Field('number')
+    title = Field('title')
+    body = Field('body')
+    state = Field('state')
+    draft = Field('draft')
+    merged = Field('merged')
+    merge_commit_sha = Field('merge_commit_sha')
+    html_url = Field('html_url')
+    user = Nested('user', User)
+    head = Nested('head', Ref)
+    base = Nested('base', Ref)
+    labels = Nested('labels', Label, many=True)
+
+
+class Issue(Model):
+    __slots__ = ('_user', '_labels')
+    id = Field('id')
+    number = Field('number')
+    title = Field('title')
+    body = Field('body')
+    state = Field('state')
+    html_url = Field('html_url')
+    user = Nested('user', User)
+    labels = Nested('labels', Label, many=True)
+
+
+class Release(Model):
+    __slots__ = ('_author',)
+    id = Field('id')
+    tag_name = Field('tag_name')
+    target_commitish = Field('target_commitish')
+    name = Field('name')
+    body = Field('body')
+    draft = Field('draft')
+    prerelease = Field('prerelease')
+    html_url = Field('html_url')
+    author = Nested('author', User)
+
+
+class Event(Model):
+    """The payload of an event without a dedicated model"""
+    __slots__ = ('_sender', '_repository')
+    action = Field('action')
+    sender = Nested('sender', User)
+    repository = Nested('repository', Repository)
+
+
+class PushEvent(Event):
+    __slots__ = ('_commits', '_head_commit', '_pusher')
+    ref = Field('ref')
+    before = Field('before')
+    after = Field('after')
+    base_ref = Field('base_ref')
+    created = Field('created')
+    deleted = Field('deleted')
+    forced = Field('forced')
+    compare = Field('compare')
+    commits = Nested('commits', Commit, many=True)
+    head_commit = Nested('head_commit', Commit)
+    pusher = Nested('pusher', GitUser)
+
+
+class PullRequestEvent(Event):
+    __slots__ = ('_pull_request',)
+    number = Field('number')
+    pull_request = Nested('pull_request', PullRequest)
+
+
+class IssuesEvent(Event):
+    __slots__ = ('_issue',)
+    issue = Nested('issue', Issue)
+
+
+class WorkflowDispatchEvent(Event):
+    __slots__ = ()
+    ref = Field('ref')
+    workflow = Field('workflow')
+
+    @property
+    def inputs(self) -> dict:
+        return self._data.get('inputs') or {}
+
+
+class ReleaseEvent(Event):
+    __slots__ = ('_release',)
+    release = Nested('release', Release)
+
+
+EVENT_MODELS = {
+    'push': PushEvent,
+    'pull_request': PullRequestEvent,
+    'pull_request_target': PullRequestEvent,
+    'issues': IssuesEvent,
+    'workflow_dispatch': WorkflowDispatchEvent,
+    'release': ReleaseEvent,
+}
+
+
+def parse_event(event_name: str, payload: dict) -> Event:
+    """
+    Wraps an event payload in the model of its event, or in Event for other events.
+    :param event_name: the name of the event, e.g. GITHUB_EVENT_NAME
+    :param payload: the decoded payload of the event
+    """
+    return EVENT_MODELS.get(event_name, Event)(payload)
@@ -1,19 +1,181 @@
+import atexit
+import mmap
 import os
+import shutil
+import threading
 from pathlib import Path
 from uuid import uuid4
 
+from actions_toolkit.command import get_command_sink
 from actions_toolkit.utils import to_command_value
 
 
+class FileCommandWriter:
+    """
+    Appends file commands while keeping each target file open.
+
+    Every file is opened once, the first time it is written to, and appends go
+    through a write buffer until `flush` or `close`. Files are keyed by path, so a
+    command whose environment variable later points to another file gets a new
+    handle.
+    """
+
+    def __init__(self, buffer_size: int = 64 * 1024):
+        self.buffer_size = buffer_size
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, file_path: str) -> bool:
+        return file_path in self._files
+
+    def write(self, file_path: str, data: str):
+        with self._lock:
+            f = self._files.get(file_path)
+            if f is None:
+                f = open(file_path, 'a', encoding='utf8', newline='', buffering=self.buffer_size)
+                self._files[file_path] = f
+            f.write(data)
+
+    def flush(self):
+        with self._lock:
+            for f in self._files.values():
+                f.flush()
+
+    def close(self):
+        with self._lock:
+            files, self._files = self._files, {}
+        for f in files.values():
+            f.close()
+
+
+_writer = None
+
+
+def use_file_command_pool(enabled: bool = True, buffer_size: int = 64 * 1024):
+    """
+    Switches file commands to a FileCommandWriter that keeps the files open and buffers appends.
+    Buffered appends are written by flush_file_commands, when the pool is disabled and at interpreter exit.
+    """
+    global _writer
+    if _writer:
+        get_command_sink().flush()
+        _writer.close()
+    _writer = FileCommandWriter(buffer_size) if enabled else None
+
+
+def flush_file_commands():
+    """Writes out file command appends held back by the pool"""
+    if _writer:
+        sink = get_command_sink()
+        sink.run(_writer.flush)
+        sink.flush()
+
+
+@atexit.register
+def _close_file_command_pool():
+    if _writer:
+        _writer.close()
+
+
 def issue_file_command(command: str, message):
+    file_path = os.getenv(f'GITHUB_{command}')
+    if not file_path:
+        raise Exception(f'Unable to find environment variable '
+                        f'for file command {command}')
+    writer = _writer
+    if writer is None or file_path not in writer:
+        if not Path(file_path).exists():
+            raise Exception(f'Missing file at path: {file_path}')
+    data = f'{to_command_value(message)}{os.linesep}'
+    # Goes through the command sink so that it stays in order with the stdout commands
+    if writer is not None:
+        get_command_sink().run(writer.write, file_path, data)
+    else:
+        get_command_sink().run(append_to_file, file_path, data)
+
+
+def issue_file_command_stream(command: str, key: str, source):
+    """
+    Appends a key/value file command whose value is streamed from source instead of being built in memory.
+    :param command: the file command, e.g. OUTPUT
+    :param key: name of the value
+    :param source: an os.PathLike file to copy, a bytes or bytearray buffer, or an iterable of str/bytes chunks.
+                   A str is written as is
+    """
     file_path = os.getenv(f'GITHUB_{command}')
     if not file_path:
         raise Exception(f'Unable to find environment variable '
                         f'for file command {command}')
     if not Path(file_path).exists():
         raise Exception(f'Missing file at path: {file_path}')
+    delimiter = f'ghadelimiter_{uuid4()}'
+    if delimiter in key:
+        raise Exception(f'Unexpected input: name should not contain the delimiter "{delimiter}"')
+
+    # Everything issued so far has to land in the file before the streamed value
+    get_command_sink().flush()
+    if _writer:
+        _writer.flush()
+
+    linesep = os.linesep.encode()
+    # Not opened in append mode: sendfile refuses targets opened with O_APPEND
+    with open(file_path, 'r+b') as f:
+        start = f.seek(0, os.SEEK_END)
+        try:
+            f.write(f'{key}<<{delimiter}'.encode('utf8') + linesep)
+            _write_value(f, source, delimiter.encode())
+            f.write(linesep + delimiter.encode() + linesep)
+        except BaseException:
+            # Do not leave a half written value behind
+            f.flush()
+            f.truncate(start)
+            raise
+
+
+def _write_value(f, source, delimiter: bytes):
+    error = Exception(f'Unexpected input: value should not contain the delimiter "{delimiter.decode()}"')
+    if isinstance(source, os.PathLike):
+        with open(source, 'rb') as src:
+            size = os.fstat(src.fileno()).st_size
+            if size == 0:
+                return
+            with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                if m.find(delimiter) != -1:
+                    raise error
+            f.flush()
+            if hasattr(os, 'sendfile'):
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(f.fileno(), src.fileno(), offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+            else:
+                shutil.copyfileobj(src, f)
+        return
+    if isinstance(source, (bytes, bytearray)):
+        if delimiter in source:
+            raise error
+        f.write(source)
+        return
+    if isinstance(source, str):
+        source = (source,)
+
+    # The delimiter may span two chunks, so keep the end of the previous one around
+    overlap = len(delimiter) - 1
+    tail = b''
+    for chunk in source:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf8')
+        if delimiter in chunk or delimiter in tail + chunk[:overlap]:
+            raise error
+        f.write(chunk)
+        tail = chunk[-overlap:] if len(chunk) >= overlap else (tail + chunk)[-overlap:]
+
+
+def append_to_file(file_path: str, data: str):
     with open(file_path, 'a', encoding='utf8', newline='') as f:
-        f.write(f'{to_command_value(message)}{os.linesep}')
+        f.write(data)
 
 
 def prepare_key_value_message(key: str, value) -> str:
@@ -28,3 +190,20 @@ def prepare_key_value_message(key: str, value) -> str:
     if delimiter in converted_value:
         raise Exception(f'Unexpected input: value should not contain the delimiter "{delimiter}"')
     return f'{key}<<{delimiter}{os.linesep}{converted_value}{os.linesep}{delimiter}'
+
+
+def prepare_key_value_messages(values: dict) -> str:
+    """
+    Serializes a whole mapping into consecutive heredoc blocks sharing one delimiter,
+    so that it can be written with a single append.
+    """
+    delimiter = f'ghadelimiter_{uuid4()}'
+    blocks = []
+    for key, value in values.items():
+        converted_value = to_command_value(value)
+        if delimiter in key:
+            raise Exception(f'Unexpected input: name should not contain the delimiter "{delimiter}"')
+        if delimiter in converted_value:
+            raise Exception(f'Unexpected input: value should not contain the delimiter "{delimiter}"')
+        blocks.append(f'{key}<<{delimiter}{os.linesep}{converted_value}{os.linesep}{delimiter}')
+    return os.linesep.join(blocks)
@@ -1,23 +1,31 @@
+import asyncio
+import hashlib
+import itertools
 import json
 import os
+import re
 import sys
+import threading
+import time
 from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache, partial
 from string import Template
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, Union
 
-import requests
+from actions_toolkit.events import Event, parse_event
+from actions_toolkit.http_cache import HTTPCache
+from actions_toolkit.json_scan import extract_paths, lookup_path, split_path
 
-t = sys.path[0]
-sys.path.remove(t)
-from github import Github
-
-sys.path.insert(0, t)
+if TYPE_CHECKING:
+    import requests
 
 Repo = namedtuple('Repo', ['owner', 'repo'])
 Issue = namedtuple('Issue', ['owner', 'repo', 'number'])
 
 
 class Context:
-    payload: dict
     event_name: str
     sha: str
     ref: str
@@ -32,11 +40,9 @@ class Context:
     graphql_url: str
 
     def __init__(self):
-        self.payload = {}
-        file = os.getenv('GITHUB_EVENT_PATH')
-        if file:
-            with open(file, 'r', encoding='utf-8', newline='') as f:
-                self.payload = json.load(f)
+        # The event payload is only read when it is first needed
+        self._event_path = os.getenv('GITHUB_EVENT_PATH')
+        self._payload = None
         self.event_name = os.getenv('GITHUB_EVENT_NAME', '')
         self.sha = os.getenv('GITHUB_SHA', '')
         self.ref = os.getenv('GITHUB_REF', '')
@@ -49,6 +55,38 @@ class Context:
         self.server_url = os.getenv('GITHUB_SERVER_URL', 'https://github.com')
         self.graphql_url = os.getenv('GITHUB_GRAPHQL_URL', 'https://api.github.com/graphql')
 
+    @property
+    def payload(self) -> dict:
+        if self._payload is None:
+            payload = {}
+            if self._event_path:
+                with open(self._event_path, 'r', encoding='utf-8', newline='') as f:
+                    payload = json.load(f)
+            # Only once loaded, so that a failed load is raised again on the next access
+            self._payload = payload
+        return self._payload
+
+    @payload.setter
+    def payload(self, payload: dict):
+        self._payload = payload
+
+    def extract(self, *paths: str) -> dict:
+        """
+        Gets values from the event payload by dotted path, e.g. `pull_request.number` or `commits.0.id`.
+        If the payload has not been loaded yet, the event file is scanned for the paths
+        instead of being decoded in full.
+        :return: path -> value for each path present in the payload
+        """
+        if self._payload is not None or not self._event_path:
+            result = {}
+            for path in paths:
+                found, value = lookup_path(self.payload, split_path(path))
+                if found:
+                    result[path] = value
+            return result
+        with open(self._event_path, 'r', encoding='utf-8', newline='') as f:
+            return extract_paths(f.read(), paths)
+
     def _repo(self):
         if os.getenv('GITHUB_REPOSITORY'):
             owner, repo = os.getenv('GITHUB_REPOSITORY').split('/')
@@ -64,6 +102,14 @@ class Context:
         owner, repo = self._repo()
         return owner, repo, actor.get('number')
 
+    @property
+    def event(self) -> Event:
+        """
+        The payload wrapped in the model of the event, e.g. a PushEvent or a PullRequestEvent,
+        whose nested objects are only wrapped when they are accessed.
+        """
+        return parse_event(self.event_name, self.payload)
+
     @property
     def repo(self):
         return Repo(*self._repo())
@@ -72,24 +118,671 @@ class Context:
     def issue(self):
         return Issue(*self._issue())
 
+    def get(self, path: str, default=None):
+        """
+        Gets a value from the event payload by dotted path, e.g. `pull_request.head.sha`.
+        Returns default if the path is not present.
+        """
+        found, value = lookup_path(self.payload, split_path(path))
+        return value if found else default
+
+
+class CachedContext(Context):
+    """
+    Context whose derived values are computed once.
+
+    `repo`, `issue` and `event` are memoized, and `get` answers dotted-path queries from
+    an index of every path in the payload, built on the first query.
+    Assigning `payload` resets them.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._cached_repo = None
+        self._cached_issue = None
+        self._cached_event = None
+        self._index = None
+
+    @Context.payload.setter
+    def payload(self, payload: dict):
+        self._payload = payload
+        self._cached_repo = None
+        self._cached_issue = None
+        self._cached_event = None
+        self._index = None
+
+    @property
+    def event(self) -> Event:
+        if self._cached_event is None:
+            self._cached_event = parse_event(self.event_name, self.payload)
+        return self._cached_event
+
+    @property
+    def repo(self):
+        if self._cached_repo is None:
+            self._cached_repo = Repo(*self._repo())
+        return self._cached_repo
+
+    @property
+    def issue(self):
+        if self._cached_issue is None:
+            self._cached_issue = Issue(*self._issue())
+        return self._cached_issue
+
+    def get(self, path: str, default=None):
+        if self._index is None:
+            self._index = _index_paths(self.payload)
+        return self._index.get(path, default)
+
+
+def _index_paths(payload) -> dict:
+    """Maps the dotted path of every value in payload to that value"""
+    index = {}
+    stack = [('', payload)]
+    while stack:
+        prefix, value = stack.pop()
+        if isinstance(value, dict):
+            items = value.items()
+        elif isinstance(value, list):
+            items = enumerate(value)
+        else:
+            continue
+        for key, child in items:
+            path = f'{prefix}{key}'
+            index[path] = child
+            if isinstance(child, (dict, list)):
+                stack.append((path + '.', child))
+    return index
+
+
+_context = None
+_context_lock = threading.Lock()
+
+
+def get_context() -> CachedContext:
+    """
+    Returns the context shared by the whole process, created on first use.
+    """
+    global _context
+    if _context is None:
+        with _context_lock:
+            if _context is None:
+                _context = CachedContext()
+    return _context
+
+
+# String literals are kept as they are, comments and whitespace runs are dropped
+_QUERY_TOKEN = re.compile(r'("""(?:\\.|[^\\])*?"""|"(?:\\.|[^"\\])*")|(?:[\s,]|#[^\n]*)+')
+_OPERATION_HEADER = re.compile(r'\s*(?:query|mutation|subscription)\b\s*\w*\s*\(([^)]*)\)')
+_VARIABLE_DEFINITION = re.compile(r'\$(\w+)\s*:')
+
+
+def _normalize_query(query: str) -> str:
+    return _QUERY_TOKEN.sub(lambda m: m.group(1) or ' ', query).strip()
+
+
+class PreparedQuery:
+    """
+    A GraphQL document normalized, hashed and encoded once, to be sent many times.
+
+    Variables declared by the operation, e.g. `query($owner: String!, $cursor: String)`,
+    are sent in the `variables` field of the request, so each call only serializes them.
+    """
+    __slots__ = ('query', 'sha256', 'variables', '_prefix')
+
+    def __init__(self, query: str):
+        self.query = _normalize_query(query)
+        self.sha256 = hashlib.sha256(self.query.encode('utf-8')).hexdigest()
+        header = _OPERATION_HEADER.match(self.query)
+        self.variables = frozenset(_VARIABLE_DEFINITION.findall(header.group(1))) if header else frozenset()
+        self._prefix = ('{"query": ' + json.dumps(self.query) + ', "variables": ').encode('utf-8')
+
+    def __repr__(self):
+        return f'PreparedQuery({self.sha256[:12]})'
+
+    def encode(self, variables: dict = None) -> bytes:
+        """
+        Returns the body of the request, keeping only the variables the operation declares.
+        """
+        variables = {k: v for k, v in (variables or {}).items() if k in self.variables}
+        return self._prefix + json.dumps(variables).encode('utf-8') + b'}'
+
+
+@lru_cache(maxsize=256)
+def prepare_query(query: str) -> PreparedQuery:
+    """
+    Returns the prepared form of query, shared by every call with the same text.
+    """
+    return PreparedQuery(query)
+
+
+# Statuses worth retrying: server errors and rate limiting
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class RateLimitScheduler:
+    """
+    Paces the requests of the Octokit clients that share it.
+
+    Requests wait for a free slot instead of failing: at most max_concurrency are in
+    flight, an optional token bucket spaces them out to rate per second, and once a
+    response reports that the budget of its rate limit resource (core, graphql,
+    search...) is down to reserve, or a Retry-After, every request waits for the reset.
+    Waiting requests are admitted by priority, lowest first, then in arrival order; a request
+    held back by the budget of its resource does not hold back those for other resources.
+    """
+
+    def __init__(self, max_concurrency: int = 10, rate: float = None, burst: int = 1,
+                 reserve: int = 0, max_wait: float = 600):
+        """
+        :param max_concurrency: the most requests in flight at once
+        :param rate: the most requests started per second on average, unlimited by default
+        :param burst: how many requests may start at once after an idle period when rate is set
+        :param reserve: how much of each rate limit budget is left unused
+        :param max_wait: the longest a request waits for its turn before an Exception is raised, in seconds
+        """
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst
+        self.reserve = reserve
+        self.max_wait = max_wait
+
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._tokens = burst
+        self._refilled = time.monotonic()
+        self._paused_until = 0
+        # resource -> [remaining, reset as a time.time() timestamp]
+        self._limits = {}
+        self._metrics = {'requests': 0, 'delayed': 0, 'wait_time': 0.0, 'max_wait_time': 0.0}
+
+    @property
+    def metrics(self) -> dict:
+        """
+        Counters since the scheduler was created: requests admitted, how many had to wait,
+        total and longest wait in seconds, requests in flight, and the last known remaining
+        budget of each rate limit resource.
+        """
+        with self._cond:
+            metrics = dict(self._metrics, in_flight=self._in_flight)
+            metrics['remaining'] = {resource: limit[0] for resource, limit in self._limits.items()}
+            return metrics
+
+    def _delay(self, resource: str) -> float:
+        """How long until a request for resource may start, 0 if it may start now"""
+        now = time.time()
+        delay = self._paused_until - now
+        limit = self._limits.get(resource)
+        if limit and limit[0] <= self.reserve:
+            delay = max(delay, limit[1] - now)
+        if self.rate:
+            elapsed = time.monotonic() - self._refilled
+            tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            if tokens < 1:
+                delay = max(delay, (1 - tokens) / self.rate)
+        return max(delay, 0)
+
+    def _next_ready(self):
+        """The first waiting request by priority that may start now, skipping those held by their resource"""
+        for entry in sorted(self._waiting):
+            if self._delay(entry[2]) <= 0:
+                return entry
+        return None
+
+    def acquire(self, resource: str = 'core', priority: int = 0):
+        """
+        Blocks until a request for resource may start, then takes a slot for it.
+        Every acquire must be followed by a release.
+        """
+        start = time.monotonic()
+        entry = (priority, next(self._seq), resource)
+        with self._cond:
+            self._waiting.append(entry)
+            try:
+                while True:
+                    delay = self._delay(resource)
+                    if delay <= 0:
+                        if self._in_flight < self.max_concurrency and self._next_ready() is entry:
+                            break
+                        # Ready, but waiting for a slot or for a request that goes first
+                        delay = None
+                    waited = time.monotonic() - start
+                    if waited + (delay or 0) > self.max_wait:
+                        raise Exception(f'Rate limited: a {resource} request would wait more than '
+                                        f'{self.max_wait} seconds')
+                    self._cond.wait(min(delay if delay is not None else self.max_wait, self.max_wait - waited))
+            finally:
+                self._waiting.remove(entry)
+                self._cond.notify_all()
+
+            if self.rate:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate) - 1
+                self._refilled = now
+            limit = self._limits.get(resource)
+            if limit and limit[0] > 0:
+                limit[0] -= 1
+            self._in_flight += 1
+            waited = time.monotonic() - start
+            self._metrics['requests'] += 1
+            self._metrics['wait_time'] += waited
+            self._metrics['max_wait_time'] = max(self._metrics['max_wait_time'], waited)
+            if waited > 0.001:
+                self._metrics['delayed'] += 1
+
+    def release(self, resp: 'requests.Response' = None, resource: str = 'core'):
+        """
+        Frees the slot of a request, learning the rate limit state from its response if there is one.
+        """
+        with self._cond:
+            self._in_flight -= 1
+            if resp is not None:
+                self._update(resp, resource)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, resource: str = 'core', priority: int = 0):
+        """
+        Holds a slot for the duration of a request. It yields a callable to pass the response to,
+        so that the rate limit headers are read when the slot is released:
+        `with scheduler.slot('core') as done: done(session.get(url))`
+        """
+        self.acquire(resource, priority)
+        responses = []
+        try:
+            yield responses.append
+        finally:
+            self.release(responses[-1] if responses else None, resource)
+
+    def _update(self, resp: 'requests.Response', resource: str):
+        headers = resp.headers
+        resource = headers.get('X-RateLimit-Resource') or resource
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        if remaining and remaining.isdigit() and reset and reset.isdigit():
+            self._limits[resource] = [int(remaining), int(reset)]
+        retry_after = headers.get('Retry-After')
+        if retry_after and retry_after.isdigit() and resp.status_code in (403, 429):
+            self._paused_until = max(self._paused_until, time.time() + int(retry_after))
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RateLimitScheduler:
+    """
+    Returns the scheduler shared by the Octokit clients of the process, created on first use.
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RateLimitScheduler()
+    return _scheduler
+
 
 class Octokit:
-    def __init__(self, token):
+    def __init__(self, token, graphql_url: str = None, pool_size: int = 10,
+                 retries: int = 3, backoff_factor: float = 0.5, max_retry_wait: float = 60,
+                 cache: HTTPCache = None, scheduler: RateLimitScheduler = None):
+        """
+        :param token: the token used to authenticate
+        :param graphql_url: the GraphQL endpoint, defaults to the one of the current context (GITHUB_GRAPHQL_URL)
+        :param pool_size: the number of connections kept alive per host
+        :param retries: how many times a request is retried on server errors and rate limits
+        :param backoff_factor: the delay before the n-th retry is backoff_factor * 2 ** n seconds,
+                               unless GitHub sends a Retry-After or rate limit reset time
+        :param max_retry_wait: the longest delay before a retry, in seconds
+        :param cache: an HTTPCache that GET requests are served from and revalidated against
+        :param scheduler: the RateLimitScheduler pacing the requests, defaults to the one shared by the process
+        """
         self.token = token
         self.headers = {
             'Authorization': f'Bearer {self.token}'
         }
-        self.rest = Github(token)
+        self.graphql_url = graphql_url or Context().graphql_url
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_retry_wait = max_retry_wait
+        self.cache = cache
+        self.scheduler = scheduler or get_scheduler()
+
+        import requests.adapters
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._rest = None
+
+    @property
+    def rest(self):
+        """The PyGithub client, imported and created on first use"""
+        if self._rest is None:
+            self._rest = _import_github()(self.token)
+        return self._rest
+
+    def request(self, method: str, url: str, priority: int = 0, **kwargs) -> 'requests.Response':
+        """
+        Sends a request through the pooled session, retrying server errors,
+        rate limits and connection errors with exponential backoff.
+
+        The request waits for its turn in the scheduler first; when several are waiting,
+        the one with the lowest priority goes first.
+
+        With a cache, GET responses are stored and revalidated with conditional requests;
+        a response served from the cache has `from_cache` set to True.
+        """
+        if self.cache is None or method.upper() != 'GET':
+            return self._send(method, url, priority, **kwargs)
 
-    def graphql(self, query: str, variables: dict) -> dict:
+        import requests
+        headers = dict(self.session.headers)
+        headers.update(kwargs.get('headers') or {})
+        full_url = requests.Request(method, url, params=kwargs.get('params')).prepare().url
+        key = self.cache.key(full_url, headers)
+        entry = self.cache.get(key)
+        if entry is not None:
+            kwargs['headers'] = dict(kwargs.get('headers') or {}, **self.cache.conditional_headers(entry))
+        resp = self._send(method, url, priority, **kwargs)
+        if entry is not None and resp.status_code == 304:
+            return self.cache.to_response(entry, resp)
+        self.cache.put(key, resp)
+        return resp
+
+    def _send(self, method: str, url: str, priority: int, **kwargs) -> 'requests.Response':
+        import requests
+        resource = self._resource(url)
+        attempt = 0
+        while True:
+            try:
+                with self.scheduler.slot(resource, priority) as done:
+                    resp = self.session.request(method, url, **kwargs)
+                    done(resp)
+            except requests.ConnectionError:
+                if attempt >= self.retries:
+                    raise
+                resp = None
+            if resp is not None and (attempt >= self.retries or not _should_retry(resp)):
+                return resp
+            time.sleep(min(self._retry_delay(resp, attempt), self.max_retry_wait))
+            attempt += 1
+
+    def _resource(self, url: str) -> str:
+        # Until a response names it in X-RateLimit-Resource
+        if url == self.graphql_url:
+            return 'graphql'
+        if '/search/' in url:
+            return 'search'
+        return 'core'
+
+    def _retry_delay(self, resp, attempt: int) -> float:
+        if resp is not None:
+            retry_after = resp.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return int(retry_after)
+            reset = resp.headers.get('X-RateLimit-Reset')
+            if resp.headers.get('X-RateLimit-Remaining') == '0' and reset and reset.isdigit():
+                return max(int(reset) - time.time(), 0)
+        return self.backoff_factor * 2 ** attempt
+
+    def graphql(self, query: Union[str, PreparedQuery], variables: dict = None) -> dict:
+        """
+        Runs a GraphQL query.
+
+        When the operation declares its variables, e.g. `query($owner: String!) { ... }`, or query is a
+        PreparedQuery, the variables are sent in the `variables` field of the request. Otherwise they are
+        substituted into the query text as `$name` placeholders, like in earlier versions.
+        """
+        prepared = query if isinstance(query, PreparedQuery) else prepare_query(query)
+        if prepared.variables or isinstance(query, PreparedQuery):
+            return self._post_graphql(prepared.query, data=prepared.encode(variables),
+                                      headers={'Content-Type': 'application/json'})
         q = {
-            'query': Template(query).substitute(variables)
+            'query': Template(query).substitute(variables or {})
         }
-        resp = requests.post('https://api.github.com/graphql', json=q, headers=self.headers)
+        return self._post_graphql(query, json=q)
+
+    def _post_graphql(self, query: str, **kwargs) -> dict:
+        resp = self.request('POST', self.graphql_url, **kwargs)
         if resp.status_code != 200:
             raise Exception(f'Query failed to run by returning code of {resp.status_code}. {query}')
         return resp.json()
 
+    def paginate_graphql(self, query: str, variables: dict = None, path: str = '',
+                         prefetch: bool = False) -> Iterator[dict]:
+        """
+        Yields the nodes of a GraphQL connection one by one, following its cursor from page to page.
+
+        The query receives the cursor of the next page as `$cursor` (null for the first page), which goes
+        in the `after:` argument of the connection. Declare it as `$cursor: String` along with the other
+        variables of the operation; in a query without declared variables it is substituted as a quoted
+        string. The connection must select `pageInfo { hasNextPage endCursor }` and either `nodes` or
+        `edges { node }`.
+        :param query: the query, or a PreparedQuery
+        :param variables: the other variables of the query
+        :param path: dotted path of the connection under `data`, e.g. `repository.issues`
+        :param prefetch: whether to fetch the next page in the background while the current one is consumed
+        """
+        variables = dict(variables or {})
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            page = self._graphql_page(query, variables, path, None)
+            while True:
+                nodes, cursor = _page_nodes(page)
+                pending = None
+                if cursor and executor:
+                    pending = executor.submit(self._graphql_page, query, variables, path, cursor)
+                yield from nodes
+                if not cursor:
+                    return
+                page = pending.result() if pending else self._graphql_page(query, variables, path, cursor)
+        finally:
+            if executor:
+                executor.shutdown(wait=False)
+
+    def _graphql_page(self, query: Union[str, PreparedQuery], variables: dict, path: str, cursor: str) -> dict:
+        prepared = query if isinstance(query, PreparedQuery) else prepare_query(query)
+        if not prepared.variables and not isinstance(query, PreparedQuery):
+            cursor = json.dumps(cursor)
+        result = self.graphql(query, dict(variables, cursor=cursor))
+        if result.get('errors'):
+            raise Exception(f'Query failed with errors: {json.dumps(result["errors"])}')
+        found, page = lookup_path(result.get('data'), split_path(path))
+        if not found or not isinstance(page, dict):
+            raise Exception(f'Connection not found in query result: {path}')
+        return page
+
+
+class AsyncOctokit:
+    """
+    Asyncio counterpart of Octokit, for fanning out many requests concurrently.
+
+    Requests run on a thread pool over the pooled session of a wrapped Octokit, so they
+    share its connections, retries, cache and rate limit scheduler. At most max_concurrency
+    requests are started at once; the others wait without holding a thread, and cancelling
+    one of them means it is never sent.
+    """
+
+    def __init__(self, token, max_concurrency: int = 50, **options):
+        """
+        :param token: the token used to authenticate
+        :param max_concurrency: the most requests started at once, at most the max_concurrency of the scheduler
+        :param options: the options of Octokit
+        """
+        scheduler = options.get('scheduler') or get_scheduler()
+        # More threads than the scheduler admits would only block in it, out of reach of cancellation
+        self.max_concurrency = min(max_concurrency, scheduler.max_concurrency)
+        options['scheduler'] = scheduler
+        options.setdefault('pool_size', self.max_concurrency)
+        self.octokit = Octokit(token, **options)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        self._loop = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Closes the connections and stops the threads of the client"""
+        self._executor.shutdown(wait=False)
+        self.octokit.session.close()
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_event_loop()
+        if self._loop is not loop:
+            # The semaphore belongs to the loop it is first used in
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def request(self, method: str, url: str, priority: int = 0, **kwargs) -> 'requests.Response':
+        """Sends a request, see Octokit.request"""
+        return await self._run(self.octokit.request, method, url, priority, **kwargs)
+
+    async def graphql(self, query: Union[str, PreparedQuery], variables: dict = None) -> dict:
+        """Runs a GraphQL query, see Octokit.graphql"""
+        return await self._run(self.octokit.graphql, query, variables)
+
+    async def paginate_graphql(self, query: Union[str, PreparedQuery], variables: dict = None,
+                               path: str = '') -> AsyncIterator[dict]:
+        """Yields the nodes of a GraphQL connection one by one, see Octokit.paginate_graphql"""
+        variables = dict(variables or {})
+        page = await self._run(self.octokit._graphql_page, query, variables, path, None)
+        while True:
+            nodes, cursor = _page_nodes(page)
+            for node in nodes:
+                yield node
+            if not cursor:
+                return
+            page = await self._run(self.octokit._graphql_page, query, variables, path, cursor)
+
+
+class GraphQLBatcher:
+    """
+    Coalesces many small GraphQL queries into aliased multi-queries.
+
+    Each submitted query is a single, unaliased top-level field selection such as
+    `repository(owner: "a", name: "b") { stargazerCount }`. Pending queries are sent
+    together as one document, `q0: ... q1: ...`, once the batch holds max_batch_size
+    queries or max_nodes estimated nodes, on flush(), or when leaving the `with` block.
+    Each query gets a future that resolves to its own part of the response.
+    """
+
+    def __init__(self, octokit: Octokit, max_batch_size: int = 50, max_nodes: int = 500000):
+        self.octokit = octokit
+        self.max_batch_size = max_batch_size
+        self.max_nodes = max_nodes
+        self._pending = []
+        self._nodes = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def submit(self, selection: str, nodes: int = 1) -> Future:
+        """
+        Queues a query.
+        :param selection: a single top-level field with its arguments and selection set
+        :param nodes: estimated number of nodes the query may return, counted against max_nodes
+        :return: a future for the data of the field
+        """
+        future = Future()
+        with self._lock:
+            if self._pending and self._nodes + nodes > self.max_nodes:
+                batch = self._take()
+            else:
+                batch = None
+            self._pending.append((selection, future))
+            self._nodes += nodes
+            if len(self._pending) >= self.max_batch_size:
+                full = self._take()
+            else:
+                full = None
+        for b in (batch, full):
+            if b:
+                self._dispatch(b)
+        return future
+
+    def flush(self):
+        """Sends the queries still pending"""
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._dispatch(batch)
+
+    def _take(self) -> list:
+        batch, self._pending, self._nodes = self._pending, [], 0
+        return batch
+
+    def _dispatch(self, batch: list):
+        fields = '\n'.join(f'  q{i}: {selection}' for i, (selection, _) in enumerate(batch))
+        query = f'query {{\n{fields}\n}}'
+        try:
+            result = self.octokit._post_graphql(query, json={'query': query})
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        failed = {}
+        for error in result.get('errors') or []:
+            path = error.get('path') or []
+            alias = path[0] if path else None
+            failed.setdefault(alias, []).append(error)
+        data = result.get('data') or {}
+        for i, (_, future) in enumerate(batch):
+            errors = failed.get(f'q{i}') or failed.get(None)
+            if errors:
+                future.set_exception(Exception(f'Query failed with errors: {json.dumps(errors)}'))
+            else:
+                future.set_result(data.get(f'q{i}'))
+
+
+def _page_nodes(page: dict) -> tuple:
+    """:return: the nodes of a connection page and the cursor of the next page, None on the last one"""
+    page_info = page.get('pageInfo') or {}
+    cursor = page_info.get('endCursor') if page_info.get('hasNextPage') else None
+    nodes = page.get('nodes')
+    if nodes is None:
+        nodes = [edge.get('node') for edge in page.get('edges') or []]
+    return nodes, cursor
+
+
+def _should_retry(resp) -> bool:
+    if resp.status_code in RETRY_STATUSES:
+        return True
+    # Secondary rate limits are reported as 403s
+    if resp.status_code == 403:
+        return 'Retry-After' in resp.headers or resp.headers.get('X-RateLimit-Remaining') == '0' \
+               or b'secondary rate limit' in resp.content.lower()
+    return False
+
+
+def _import_github():
+    # Keeps this module from shadowing PyGithub when a script runs from this directory
+    t = sys.path[0]
+    sys.path.remove(t)
+    try:
+        from github import Github
+    finally:
+        sys.path.insert(0, t)
+    return Github
+
+
+def get_octokit(token, **options):
+    return Octokit(token, **options)
+
 
-def get_octokit(token):
-    return Octokit(token)
+def get_async_octokit(token, **options):
+    return AsyncOctokit(token, **options)
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from stat import S_ISDIR
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+# Headers of a cached response that are stale once it has been revalidated
+_VOLATILE_HEADERS = ('Date', 'X-RateLimit-Limit', 'X-RateLimit-Remaining', 'X-RateLimit-Reset',
+                     'X-RateLimit-Used', 'X-RateLimit-Resource', 'X-GitHub-Request-Id')
+
+
+class HTTPCache:
+    """
+    Disk cache of GET responses that carry an ETag or Last-Modified header.
+
+    Cached responses are revalidated with If-None-Match / If-Modified-Since; GitHub
+    answers 304 Not Modified when they are still current, which does not count against
+    the primary rate limit. Entries are keyed by URL, Accept header and a hash of the
+    Authorization header, so tokens with different access never share responses, and
+    the least recently used ones are evicted once max_entries or max_bytes is exceeded.
+    """
+
+    def __init__(self, cache_dir: str = None, max_entries: int = 1000, max_bytes: int = 50 * 2 ** 20):
+        """
+        :param cache_dir: where responses are kept, defaults to a directory in the temp dir
+                          shared by all the steps of a job. It must belong to the current user
+        :param max_entries: the most responses kept
+        :param max_bytes: the most bytes of response bodies kept
+        """
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), 'actions-toolkit', 'http')
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._index = None
+        self._private = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url: str, headers: dict) -> str:
+        """Returns the cache key of a request from its full URL and headers"""
+        auth = hashlib.sha256((headers.get('Authorization') or '').encode('utf-8')).hexdigest()
+        identity = json.dumps([url, headers.get('Accept') or '', auth])
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def _is_private(self) -> bool:
+        """
+        Creates the cache directory readable by the current user only, and checks that
+        an existing one is owned by that user and not open to others, as responses may
+        hold private data. The cache is not used otherwise.
+        """
+        if self._private is None:
+            try:
+                os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+                stat = os.lstat(self.cache_dir)
+                private = S_ISDIR(stat.st_mode)
+                if private and hasattr(os, 'getuid'):
+                    private = stat.st_uid == os.getuid()
+                    if private and stat.st_mode & 0o077:
+                        os.chmod(self.cache_dir, 0o700)
+            except OSError:
+                private = False
+            self._private = private
+        return self._private
+
+    def _load_index(self) -> dict:
+        # key -> [last use, size], read from the directory the first time it is needed
+        if self._index is None:
+            index = {}
+            try:
+                with os.scandir(self.cache_dir) as it:
+                    for entry in it:
+                        if entry.is_file() and len(entry.name) == 64:
+                            stat = entry.stat()
+                            index[entry.name] = [stat.st_mtime, stat.st_size]
+            except OSError:
+                pass
+            self._index = index
+        return self._index
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        :return: the cached entry, a dict with the url, headers and body of the response, or None
+        """
+        if not self._is_private():
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            index = self._load_index()
+            index[key] = [time.time(), len(body)]
+        meta['body'] = body
+        return meta
+
+    def put(self, key: str, resp: 'requests.Response'):
+        """Stores a 200 response, if it has a validator and may be stored"""
+        if resp.status_code != 200 or 'no-store' in resp.headers.get('Cache-Control', ''):
+            return
+        if not resp.headers.get('ETag') and not resp.headers.get('Last-Modified'):
+            return
+        body = resp.content
+        if len(body) > self.max_bytes:
+            return
+        if not self._is_private():
+            return
+        meta = json.dumps({'url': resp.url, 'headers': dict(resp.headers)}).encode('utf-8')
+        path = self._path(key)
+        try:
+            tmp = f'{path}.{os.getpid()}.{threading.get_ident()}'
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o600)
+            with open(fd, 'wb') as f:
+                f.write(meta + b'\n' + body)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        with self._lock:
+            index = self._load_index()
+            index[key] = [time.time(), len(body)]
+            self._evict(index)
+
+    def _evict(self, index: dict):
+        total = sum(size for _, size in index.values())
+        if len(index) <= self.max_entries and total <= self.max_bytes:
+            return
+        for key, (_, size) in sorted(index.items(), key=lambda item: item[1][0]):
+            if len(index) <= self.max_entries and total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            del index[key]
+            total -= size
+
+    def clear(self):
+        """Removes every cached response"""
+        with self._lock:
+            for key in list(self._load_index()):
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._index = {}
+
+    @staticmethod
+    def conditional_headers(entry: dict) -> dict:
+        """The headers that revalidate a cached entry"""
+        headers = {}
+        etag = entry['headers'].get('ETag')
+        if etag:
+            headers['If-None-Match'] = etag
+        last_modified = entry['headers'].get('Last-Modified')
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    @staticmethod
+    def to_response(entry: dict, revalidation: 'requests.Response') -> 'requests.Response':
+        """
+        Builds the response served from a cached entry once revalidation answered 304.
+        Rate limit headers are taken from the 304 response, and `from_cache` is set to True.
+        """
+        import requests
+        from requests.structures import CaseInsensitiveDict
+        headers = CaseInsensitiveDict(entry['headers'])
+        for name in _VOLATILE_HEADERS:
+            if name in revalidation.headers:
+                headers[name] = revalidation.headers[name]
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.reason = 'OK'
+        resp.headers = headers
+        resp._content = entry['body']
+        resp.url = entry['url']
+        resp.encoding = requests.utils.get_encoding_from_headers(headers)
+        resp.request = revalidation.request
+        resp.elapsed = revalidation.elapsed
+        resp.from_cache = True
+        return resp
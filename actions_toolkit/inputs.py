@@ -0,0 +1,299 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from functools import lru_cache
+from stat import S_ISDIR
+from typing import Iterable, List, Mapping
+
+TRUE_VALUES = frozenset({'true', 'True', 'TRUE'})
+FALSE_VALUES = frozenset({'false', 'False', 'FALSE'})
+
+_MISSING = object()
+
+
+@lru_cache(maxsize=1024)
+def normalize_name(name: str) -> str:
+    """Turns an input name into the suffix of its INPUT_ environment variable"""
+    return name.replace(' ', '_').upper()
+
+
+class Inputs:
+    """
+    Snapshot of all action inputs.
+
+    The INPUT_* environment variables are indexed once when the snapshot is
+    created, and every typed accessor parses a given input at most once.
+    Parsed lists and JSON values are shared between calls and should not be
+    modified.
+    """
+
+    def __init__(self, environ: Mapping[str, str] = None):
+        environ = os.environ if environ is None else environ
+        self._values = {k[6:]: v for k, v in environ.items() if k.startswith('INPUT_')}
+        self._cache = {}
+
+    def __contains__(self, name: str) -> bool:
+        return bool(self._values.get(normalize_name(name)))
+
+    def names(self) -> List[str]:
+        """Normalized names of all inputs that are set"""
+        return [k for k, v in self._values.items() if v]
+
+    def _raw(self, name: str, required: bool) -> str:
+        key = normalize_name(name)
+        val = self._values.get(key, '')
+        if required and not val:
+            raise Exception(f'Input required and not supplied: {key}')
+        return val
+
+    def _memo(self, key: tuple, parse, *args):
+        val = self._cache.get(key, _MISSING)
+        if val is _MISSING:
+            val = self._cache[key] = parse(*args)
+        return val
+
+    def get(self, name: str, required: bool = False, trim_whitespace: bool = True) -> str:
+        """
+        Gets the value of an input, like core.get_input.
+        Returns an empty string if the value is not defined.
+        """
+        return self._memo(('str', name, required, trim_whitespace), self._parse_str, name, required, trim_whitespace)
+
+    def _parse_str(self, name: str, required: bool, trim_whitespace: bool) -> str:
+        val = self._raw(name, required)
+        return val.strip() if trim_whitespace else val
+
+    def get_bool(self, name: str, required: bool = False, default: bool = None) -> bool:
+        """
+        Gets a boolean input following the YAML 1.2 "core schema", like core.get_boolean_input.
+        Returns default if the input is not defined.
+        """
+        return self._memo(('bool', name, required, default), self._parse_bool, name, required, default)
+
+    def _parse_bool(self, name: str, required: bool, default: bool) -> bool:
+        val = self._raw(name, required).strip()
+        if not val and default is not None:
+            return default
+        if val in TRUE_VALUES:
+            return True
+        if val in FALSE_VALUES:
+            return False
+        raise TypeError(f'Input does not meet YAML 1.2 "Core Schema" specification: {name}\n'
+                        f'Support boolean input list: `true | True | TRUE | false | False | FALSE`')
+
+    def get_int(self, name: str, required: bool = False, default: int = None) -> int:
+        """Gets an integer input. Returns default if the input is not defined."""
+        return self._memo(('int', name, required, default), self._convert, name, required, default, int,
+                          'a valid integer')
+
+    def get_float(self, name: str, required: bool = False, default: float = None) -> float:
+        """Gets a float input. Returns default if the input is not defined."""
+        return self._memo(('float', name, required, default), self._convert, name, required, default, float,
+                          'a valid number')
+
+    def get_json(self, name: str, required: bool = False, default=None):
+        """Gets an input holding a JSON document. Returns default if the input is not defined."""
+        # The default is applied after the memo, as it may be unhashable
+        val = self._memo(('json', name, required), self._convert, name, required, _MISSING, json.loads,
+                         'valid JSON')
+        return default if val is _MISSING else val
+
+    def _convert(self, name: str, required: bool, default, convert, description: str):
+        val = self._raw(name, required).strip()
+        if not val:
+            return default
+        try:
+            return convert(val)
+        except ValueError:
+            raise TypeError(f'Input is not {description}: {name}') from None
+
+    def get_list(self, name: str, required: bool = False, trim_whitespace: bool = True) -> List[str]:
+        """Gets the non-empty lines of a multiline input, like core.get_multiline_input."""
+        return self._memo(('list', name, required, trim_whitespace), self._parse_list, name, required,
+                          trim_whitespace)
+
+    def _parse_list(self, name: str, required: bool, trim_whitespace: bool) -> List[str]:
+        lines = [x for x in self._raw(name, required).split('\n') if x != '']
+        return [x.strip() for x in lines] if trim_whitespace else lines
+
+    def get_enum(self, name: str, choices: Iterable[str], required: bool = False, default: str = None) -> str:
+        """Gets an input that must be one of choices. Returns default if the input is not defined."""
+        choices = tuple(choices)
+        return self._memo(('enum', name, required, default, choices), self._parse_enum, name, choices, required,
+                          default)
+
+    def _parse_enum(self, name: str, choices: tuple, required: bool, default: str) -> str:
+        val = self._raw(name, required).strip()
+        if not val:
+            return default
+        if val not in choices:
+            raise TypeError(f'Input must be one of {", ".join(choices)}: {name}')
+        return val
+
+
+class ActionInputs:
+    """Base of the objects returned by load_inputs, one slot per declared input"""
+    __slots__ = ()
+
+    def _asdict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        fields = ', '.join(f'{k}={v!r}' for k, v in self._asdict().items())
+        return f'{type(self).__name__}({fields})'
+
+
+# (action.yml path, mtime, size) -> (schema, ActionInputs subclass)
+_schemas = {}
+
+
+def _entry_script_dir() -> str:
+    # GITHUB_ACTION_PATH is only set for composite actions, and the working directory is
+    # the workspace of the calling repository, so look next to the script being run
+    script = getattr(sys.modules.get('__main__'), '__file__', None) or (sys.argv[0] if sys.argv else '')
+    if not script or not os.path.isfile(script):
+        raise Exception('Unable to find action.yml: GITHUB_ACTION_PATH is not set, pass action_path')
+    return os.path.dirname(os.path.abspath(script))
+
+
+def _find_action_file(action_path: str = None) -> str:
+    action_path = action_path or os.getenv('GITHUB_ACTION_PATH') or _entry_script_dir()
+    if os.path.isfile(action_path):
+        return action_path
+    for file_name in ('action.yml', 'action.yaml'):
+        file_path = os.path.join(action_path, file_name)
+        if os.path.isfile(file_path):
+            return file_path
+    raise Exception(f'Unable to find action.yml in {action_path}')
+
+
+def _compile_schema(file_path: str) -> list:
+    try:
+        import yaml
+    except ImportError:
+        raise Exception('PyYAML is required to read action.yml, install it with `pip install PyYAML`') from None
+    with open(file_path, 'r', encoding='utf-8') as f:
+        manifest = yaml.safe_load(f) or {}
+    schema = []
+    for name, spec in (manifest.get('inputs') or {}).items():
+        spec = spec or {}
+        default = spec.get('default')
+        if isinstance(default, bool):
+            default = 'true' if default else 'false'
+        schema.append([
+            name,
+            normalize_name(name),
+            name.replace('-', '_').replace(' ', '_').lower(),
+            bool(spec.get('required', False)),
+            None if default is None else str(default),
+        ])
+    return schema
+
+
+def _is_private_dir(path: str) -> bool:
+    """
+    Creates the directory readable by the current user only, and checks that an existing
+    one is owned by that user and not open to others, so that nobody else can plant or
+    redirect a cached schema. The cache is not used otherwise.
+    """
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        stat = os.lstat(path)
+        private = S_ISDIR(stat.st_mode)
+        if private and hasattr(os, 'getuid'):
+            private = stat.st_uid == os.getuid()
+            if private and stat.st_mode & 0o077:
+                os.chmod(path, 0o700)
+    except OSError:
+        private = False
+    return private
+
+
+def _load_schema(file_path: str, cache_dir: str = None):
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    cached = _schemas.get(key)
+    if cached:
+        return cached
+
+    # The compiled schema is kept on disk as JSON so that later runs skip YAML parsing
+    cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), 'actions-toolkit')
+    use_cache = _is_private_dir(cache_dir)
+    cache_file = os.path.join(cache_dir, hashlib.sha1(key[0].encode()).hexdigest() + '.json')
+    schema = None
+    if use_cache:
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('mtime') == stat.st_mtime_ns and data.get('size') == stat.st_size:
+                schema = data['schema']
+        except (OSError, ValueError, KeyError):
+            pass
+    if schema is None:
+        schema = _compile_schema(file_path)
+        if use_cache:
+            tmp = f'{cache_file}.{os.getpid()}'
+            try:
+                fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                with open(fd, 'w', encoding='utf-8') as f:
+                    json.dump({'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'schema': schema}, f)
+                os.replace(tmp, cache_file)
+            except OSError:
+                pass
+
+    cls = type('ActionInputs', (ActionInputs,), {'__slots__': tuple(field[2] for field in schema)})
+    _schemas[key] = schema, cls
+    return schema, cls
+
+
+_ACCESSORS = {
+    str: Inputs.get,
+    bool: Inputs.get_bool,
+    int: Inputs.get_int,
+    float: Inputs.get_float,
+    list: Inputs.get_list,
+    'json': Inputs.get_json,
+}
+
+
+def load_inputs(action_path: str = None, types: Mapping[str, object] = None,
+                environ: Mapping[str, str] = None, cache_dir: str = None) -> ActionInputs:
+    """
+    Reads, validates and converts every input declared in action.yml in a single pass.
+
+    Inputs without a value fall back to their declared default. Problems with all
+    inputs are collected and raised together in one Exception.
+    :param action_path: the action directory or its action.yml, defaults to GITHUB_ACTION_PATH or else
+                        the directory of the script being run
+    :param types: input name -> str, bool, int, float, list (multiline) or 'json'. Inputs default to str
+    :param environ: environment to read the INPUT_* variables from, defaults to os.environ
+    :param cache_dir: where the compiled schema is kept between runs, defaults to a directory in the temp dir.
+                      It is only used when it belongs to the current user
+    :return: an object with one attribute per input, named after the input in snake case
+    """
+    schema, cls = _load_schema(_find_action_file(action_path), cache_dir)
+    types = types or {}
+    environ = os.environ if environ is None else environ
+
+    values = {}
+    for name, key, attr, required, default in schema:
+        val = environ.get(f'INPUT_{key}', '')
+        values[f'INPUT_{key}'] = val if val or default is None else default
+    inputs = Inputs(values)
+
+    result = cls()
+    errors = []
+    for name, key, attr, required, default in schema:
+        kind = types.get(name, types.get(attr, str))
+        accessor = _ACCESSORS.get(kind)
+        if accessor is None:
+            raise ValueError(f'Unsupported input type for {name}: {kind}')
+        try:
+            setattr(result, attr, accessor(inputs, name, required=required))
+        except Exception as e:
+            errors.append(str(e).split('\n')[0])
+    if errors:
+        raise Exception('Invalid inputs:\n' + '\n'.join(f'  {error}' for error in errors))
+    return result
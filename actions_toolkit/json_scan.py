@@ -0,0 +1,126 @@
+import json
+import re
+from json.decoder import scanstring
+from typing import Iterable, Tuple, Union
+
+_WS = re.compile(r'[ \t\n\r]*')
+_decoder = json.JSONDecoder()
+
+PathKey = Union[str, int]
+
+
+class _Done(Exception):
+    """Raised once every requested path has been found, to stop scanning early"""
+
+
+def split_path(path: Union[str, Iterable[PathKey]]) -> Tuple[PathKey, ...]:
+    """Turns `pull_request.head.sha` or `commits.0.id` into a tuple of keys"""
+    if not isinstance(path, str):
+        return tuple(path)
+    return tuple(int(part) if part.isdigit() else part for part in path.split('.'))
+
+
+def extract_paths(text: str, paths: Iterable[str]) -> dict:
+    """
+    Extracts values from a JSON document without decoding all of it.
+
+    Only the values at the requested paths are decoded; everything else is
+    skipped, and the scan stops as soon as all paths have been found.
+    :param text: the JSON document
+    :param paths: dotted paths such as `pull_request.number`, numeric parts index arrays
+    :return: path -> value for each path found in the document
+    """
+    trie = {}
+    for path in paths:
+        node = trie
+        keys = split_path(path)
+        for key in keys:
+            node = node.setdefault(key, {})
+        node[None] = path
+    result = {}
+    state = {'remaining': sum(1 for _ in _leaves(trie))}
+    try:
+        _scan(text, _WS.match(text, 0).end(), trie, result, state)
+    except _Done:
+        pass
+    return result
+
+
+def _leaves(node: dict):
+    for key, child in node.items():
+        if key is None:
+            yield child
+        else:
+            yield from _leaves(child)
+
+
+def _scan(text: str, idx: int, node: dict, result: dict, state: dict) -> int:
+    """Scans the value starting at idx, returns the index just after it"""
+    if None in node:
+        value, end = _decoder.raw_decode(text, idx)
+        result[node[None]] = value
+        for path in _leaves({k: v for k, v in node.items() if k is not None}):
+            # Nested paths of a decoded value are read from it directly
+            found, sub = lookup_path(value, split_path(path)[len(split_path(node[None])):])
+            if found:
+                result[path] = sub
+        state['remaining'] -= sum(1 for _ in _leaves(node))
+        if state['remaining'] <= 0:
+            raise _Done()
+        return end
+
+    ch = text[idx:idx + 1]
+    if ch == '{':
+        idx = _WS.match(text, idx + 1).end()
+        if text[idx:idx + 1] == '}':
+            return idx + 1
+        while True:
+            key, idx = scanstring(text, idx + 1)
+            idx = _WS.match(text, idx).end() + 1
+            idx = _WS.match(text, idx).end()
+            child = node.get(key)
+            if child is None and key.isdigit():
+                child = node.get(int(key))
+            idx = _scan(text, idx, child, result, state) if child else _skip(text, idx)
+            idx = _WS.match(text, idx).end()
+            if text[idx] == '}':
+                return idx + 1
+            idx = _WS.match(text, idx + 1).end()
+    if ch == '[':
+        idx = _WS.match(text, idx + 1).end()
+        if text[idx:idx + 1] == ']':
+            return idx + 1
+        i = 0
+        while True:
+            child = node.get(i)
+            idx = _scan(text, idx, child, result, state) if child else _skip(text, idx)
+            idx = _WS.match(text, idx).end()
+            if text[idx] == ']':
+                return idx + 1
+            idx = _WS.match(text, idx + 1).end()
+            i += 1
+    return _skip(text, idx)
+
+
+def _skip(text: str, idx: int) -> int:
+    """Returns the index just after the value starting at idx"""
+    if text[idx:idx + 1] == '"':
+        return scanstring(text, idx + 1)[1]
+    # The C decoder walks a skipped value faster than any Python level scan,
+    # and the decoded value is dropped right away.
+    return _decoder.raw_decode(text, idx)[1]
+
+
+def lookup_path(value, keys: Tuple[PathKey, ...]):
+    """
+    Walks a decoded JSON value along keys.
+    :return: (found, value)
+    """
+    for key in keys:
+        if isinstance(value, dict) and str(key) in value:
+            value = value[str(key)]
+        elif isinstance(value, list) and isinstance(key, int) and key < len(value):
+            value = value[key]
+        else:
+            return False, None
+    return True, value
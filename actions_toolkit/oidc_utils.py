@@ -1,8 +1,11 @@
+import base64
+import json
 import os
+import threading
+import time
+from typing import Callable, Optional
 from urllib.parse import quote
 
-import requests
-
 
 class OidcClient:
 
@@ -22,6 +25,7 @@ class OidcClient:
 
     @staticmethod
     def get_call(id_token_url: str):
+        import requests
         headers = {
             'Authorization': 'Bearer ' + OidcClient.get_request_token()
         }
@@ -48,3 +52,96 @@ class OidcClient:
             return id_token
         except Exception as e:
             raise Exception(f'Error message: {str(e)}')
+
+
+def token_expiry(token: str) -> Optional[float]:
+    """
+    Reads the `exp` claim of a JWT, without verifying its signature.
+    :return: the expiry as a time.time() timestamp, or None if the token has none
+    """
+    try:
+        payload = token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return float(claims['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class IdTokenCache:
+    """
+    ID tokens by audience, reused until shortly before they expire.
+
+    Concurrent requests for the same audience share a single call to the OIDC provider,
+    whether they come from threads (get) or asyncio tasks (get_async). Tokens whose
+    expiry cannot be read are not kept.
+    """
+
+    def __init__(self, fetch: Callable[[Optional[str]], str] = None, refresh_margin: float = 60):
+        """
+        :param fetch: requests a new token for an audience, defaults to OidcClient.get_id_token
+        :param refresh_margin: how many seconds before its expiry a token is replaced
+        """
+        self.fetch = fetch or OidcClient.get_id_token
+        self.refresh_margin = refresh_margin
+        self._tokens = {}
+        self._locks = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, audience: Optional[str]) -> Optional[str]:
+        entry = self._tokens.get(audience)
+        if entry and entry[1] - self.refresh_margin > time.time():
+            return entry[0]
+        return None
+
+    def get(self, audience: str = None) -> str:
+        """Returns a token for audience, requesting one only if there is no fresh one"""
+        token = self._cached(audience)
+        if token is not None:
+            return token
+        with self._lock:
+            lock = self._locks.setdefault(audience, threading.Lock())
+        with lock:
+            # Another thread may have fetched it while this one was waiting
+            token = self._cached(audience)
+            if token is None:
+                token = self.fetch(audience)
+                expiry = token_expiry(token)
+                if expiry is not None:
+                    self._tokens[audience] = (token, expiry)
+            return token
+
+    async def get_async(self, audience: str = None) -> str:
+        """Returns a token for audience without blocking the event loop, see get"""
+        token = self._cached(audience)
+        if token is not None:
+            return token
+        import asyncio
+        loop = asyncio.get_event_loop()
+        key = (loop, audience)
+        future = self._pending.get(key)
+        if future is None:
+            future = self._pending[key] = loop.run_in_executor(None, self.get, audience)
+            future.add_done_callback(lambda _: self._pending.pop(key, None))
+        # A cancelled task must not cancel the request the other tasks are waiting for
+        return await asyncio.shield(future)
+
+    def clear(self):
+        """Forgets every cached token"""
+        self._tokens.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_id_token_cache() -> IdTokenCache:
+    """
+    Returns the ID token cache shared by the whole process, created on first use.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = IdTokenCache()
+    return _cache
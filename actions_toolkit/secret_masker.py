@@ -0,0 +1,141 @@
+import re
+from collections import deque
+from typing import Iterable
+
+MASK = '***'
+
+
+class SecretMasker:
+    """
+    Replaces registered secrets in text.
+
+    All secrets are matched at once with an Aho-Corasick automaton, so masking
+    is linear in the length of the text whatever the number of secrets.
+    """
+
+    def __init__(self, secrets: Iterable[str] = (), replacement: str = MASK):
+        self.replacement = replacement
+        self._secrets = set()
+        self._goto = None
+        self._fail = None
+        self._longest = None
+        self._first = None
+        for secret in secrets:
+            self.add(secret)
+
+    def __contains__(self, secret) -> bool:
+        return secret in self._secrets
+
+    def __len__(self) -> int:
+        return len(self._secrets)
+
+    def add(self, secret: str) -> bool:
+        """
+        Registers a secret.
+        :return: whether the secret was not registered yet
+        """
+        if not secret or secret in self._secrets:
+            return False
+        self._secrets.add(secret)
+        self._goto = None
+        return True
+
+    def _build(self):
+        goto = [{}]
+        longest = [0]
+        for secret in self._secrets:
+            state = 0
+            for ch in secret:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    longest.append(0)
+                state = nxt
+            longest[state] = max(longest[state], len(secret))
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                longest[nxt] = max(longest[nxt], longest[fail[nxt]])
+
+        self._goto = goto
+        self._fail = fail
+        self._longest = longest
+        # Characters that can start a match, used to skip ahead while no match is in progress
+        self._first = re.compile('[' + ''.join(re.escape(ch) for ch in goto[0]) + ']')
+
+    def mask(self, text: str) -> str:
+        """Returns the text with every occurrence of a registered secret replaced"""
+        if not self._secrets or not text:
+            return text
+        if self._goto is None:
+            self._build()
+        goto, fail, longest, first = self._goto, self._fail, self._longest, self._first
+
+        spans = []
+        state = 0
+        i = 0
+        n = len(text)
+        while i < n:
+            if state == 0:
+                m = first.search(text, i)
+                if m is None:
+                    break
+                i = m.start()
+            ch = text[i]
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if longest[state]:
+                start, end = i + 1 - longest[state], i + 1
+                while spans and spans[-1][0] >= start:
+                    spans.pop()
+                if spans and spans[-1][1] >= start:
+                    spans[-1][1] = end
+                else:
+                    spans.append([start, end])
+            i += 1
+
+        if not spans:
+            return text
+        parts = []
+        pos = 0
+        for start, end in spans:
+            parts.append(text[pos:start])
+            parts.append(self.replacement)
+            pos = end
+        parts.append(text[pos:])
+        return ''.join(parts)
+
+
+_masker = SecretMasker()
+
+
+def register_secret(secret: str) -> bool:
+    """
+    Adds a secret to the process-wide registry used to mask toolkit output.
+    :return: whether the secret was not registered yet
+    """
+    return _masker.add(secret)
+
+
+def is_registered(secret: str) -> bool:
+    return secret in _masker
+
+
+def has_secrets() -> bool:
+    return len(_masker) > 0
+
+
+def mask_secrets(text: str) -> str:
+    """Replaces every registered secret in text with `***`"""
+    return _masker.mask(text)
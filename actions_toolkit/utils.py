@@ -51,6 +51,9 @@ def to_command_value(input_val) -> str:
         return ''
     if isinstance(input_val, str):
         return str(input_val)
+    if type(input_val) is int:
+        # Same text as json.dumps, without going through the encoder
+        return str(input_val)
     return json.dumps(input_val)
 
 
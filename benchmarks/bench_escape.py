@@ -0,0 +1,81 @@
+"""
+Micro-benchmark for command escaping.
+
+Compares the escaping used by `actions_toolkit.command` against the previous
+chained `str.replace` implementation and against single-pass alternatives
+(`str.translate` and a regex substitution) on short annotation properties and
+multi-megabyte messages.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_escape.py [--number N]
+"""
+import argparse
+import json
+import re
+import timeit
+
+from actions_toolkit.command import escape_data, escape_property
+
+DATA_TABLE = str.maketrans({'%': '%25', '\r': '%0D', '\n': '%0A'})
+PROPERTY_TABLE = str.maketrans({'%': '%25', '\r': '%0D', '\n': '%0A', ':': '%3A', ',': '%2C'})
+DATA_PATTERN = re.compile('[%\r\n]')
+PROPERTY_PATTERN = re.compile('[%\r\n:,]')
+REPLACEMENTS = {'%': '%25', '\r': '%0D', '\n': '%0A', ':': '%3A', ',': '%2C'}
+
+
+def baseline_data(s) -> str:
+    s = s if isinstance(s, str) else json.dumps(s)
+    return s.replace('%', '%25') \
+        .replace('\r', '%0D').replace('\n', '%0A')
+
+
+def baseline_property(s) -> str:
+    s = s if isinstance(s, str) else json.dumps(s)
+    return s.replace('%', '%25').replace('\r', '%0D') \
+        .replace('\n', '%0A').replace(':', '%3A').replace(',', '%2C')
+
+
+def translate_data(s: str) -> str:
+    return s.translate(DATA_TABLE)
+
+
+def translate_property(s: str) -> str:
+    return s.translate(PROPERTY_TABLE)
+
+
+def regex_data(s: str) -> str:
+    return DATA_PATTERN.sub(lambda m: REPLACEMENTS[m.group()], s)
+
+
+def regex_property(s: str) -> str:
+    return PROPERTY_PATTERN.sub(lambda m: REPLACEMENTS[m.group()], s)
+
+
+DATA_FUNCS = [baseline_data, escape_data, translate_data, regex_data]
+PROPERTY_FUNCS = [baseline_property, escape_property, translate_property, regex_property]
+
+CASES = [
+    ('short property', 'src/actions_toolkit/core.py', PROPERTY_FUNCS),
+    ('line number', 1234, [baseline_property, escape_property]),
+    ('short message', 'Unused import os', DATA_FUNCS),
+    ('4 MB plain', 'a' * 4 * 1024 * 1024, DATA_FUNCS),
+    ('4 MB stack trace', '  File "main.py", line 12, in run: 100%\n' * 100000, DATA_FUNCS),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=0, help='iterations per case (default: auto)')
+    args = parser.parse_args()
+
+    for name, value, funcs in CASES:
+        number = args.number or (20 if isinstance(value, str) and len(value) > 1024 else 200000)
+        expected = funcs[0](value)
+        for func in funcs:
+            assert func(value) == expected, func.__name__
+            seconds = timeit.timeit(lambda: func(value), number=number) / number
+            print(f'{name:<18} {func.__name__:<20} {seconds * 1e6:12.3f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Import-time benchmark for `actions_toolkit.core` and the other modules of the package.
+
+Imports each module in a fresh interpreter with `python -X importtime`, reports the
+median cumulative import time and the slowest modules it pulls in, and fails if a
+heavy dependency (requests, PyGithub) gets imported or if the time exceeds --max-ms.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_import.py [--runs N] [--max-ms MS] [module ...]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ('requests', 'github', 'urllib3', 'yaml')
+
+
+def import_times(module: str) -> dict:
+    """Imports module in a new interpreter, returns imported module -> (self us, cumulative us)"""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(self_us), int(cumulative_us)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('modules', nargs='*', default=['actions_toolkit.core'])
+    parser.add_argument('--runs', type=int, default=5, help='imports per module (default: 5)')
+    parser.add_argument('--max-ms', type=float, default=None, help='fail above this median import time')
+    parser.add_argument('--top', type=int, default=10, help='how many of the slowest modules to list')
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        runs = [import_times(module) for _ in range(args.runs)]
+        median = statistics.median(run[module][1] for run in runs) / 1000
+        print(f'{module:<30} {median:8.1f} ms (median of {args.runs})')
+
+        slowest = sorted(runs[-1].items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+        for name, (self_us, cumulative_us) in slowest:
+            print(f'    {name:<40} self {self_us / 1000:7.1f} ms  cumulative {cumulative_us / 1000:7.1f} ms')
+
+        heavy = sorted(name for name in runs[-1] if name.split('.')[0] in HEAVY_MODULES)
+        if heavy:
+            print(f'    heavy dependencies imported: {", ".join(heavy[:5])}')
+            failed = True
+        if args.max_ms is not None and median > args.max_ms:
+            print(f'    slower than {args.max_ms} ms')
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Throughput benchmark for `actions_toolkit.command_parser`.
+
+Writes a synthetic runner log and a GITHUB_OUTPUT style file of the requested
+size to a temporary directory, then parses both and reports MB/s. Multi-GB
+runs only need disk space: the parser reads line by line, so memory stays flat.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_parser.py [--size-mb N]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from actions_toolkit.command import Command
+from actions_toolkit.command_parser import parse_commands, parse_file_commands
+from actions_toolkit.file_command import prepare_key_value_message
+
+
+def write_log(path: str, size: int):
+    lines = [
+        'Collecting dependencies, this is a regular log line\n',
+        str(Command('debug', {}, 'cache hit for key linux-x64-3f2a\n')) + '\n',
+        str(Command('warning', {'file': 'src/app.py', 'line': 12, 'col': 4}, 'Unused import: os')) + '\n',
+        str(Command('group', {}, 'Run tests')) + '\n',
+        '  test_core.py::test_escape PASSED 100%\n',
+        str(Command('endgroup', {}, '')) + '\n',
+    ]
+    block = ''.join(lines) * 1000
+    with open(path, 'w', encoding='utf8', newline='') as f:
+        written = 0
+        while written < size:
+            f.write(block)
+            written += len(block)
+
+
+def write_file_commands(path: str, size: int):
+    block = ''.join(prepare_key_value_message(f'output_{i}', 'line of value\n' * (i % 8)) + os.linesep
+                    for i in range(1000))
+    with open(path, 'w', encoding='utf8', newline='') as f:
+        written = 0
+        while written < size:
+            f.write(block)
+            written += len(block)
+
+
+def measure(name: str, path: str, parse):
+    size = os.path.getsize(path)
+    start = time.perf_counter()
+    with open(path, 'r', encoding='utf8', newline='') as f:
+        count = sum(1 for _ in parse(f))
+    elapsed = time.perf_counter() - start
+    print(f'{name:<14} {size / 2 ** 20:9.1f} MB {count:>10} records {elapsed:8.2f} s '
+          f'{size / 2 ** 20 / elapsed:8.1f} MB/s')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size-mb', type=int, default=64, help='size of each generated file (default: 64)')
+    args = parser.parse_args()
+    size = args.size_mb * 2 ** 20
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, 'runner.log')
+        output_path = os.path.join(tmp, 'output')
+        write_log(log_path, size)
+        write_file_commands(output_path, size)
+        measure('commands', log_path, parse_commands)
+        measure('file commands', output_path, parse_file_commands)
+
+
+if __name__ == '__main__':
+    main()
@@ -29,5 +29,8 @@ setup(
         'requests',
         'PyGithub'
     ],
+    extras_require={
+        'schema': ['PyYAML']
+    },
     python_requires='>=3.6',
 )
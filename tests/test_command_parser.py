@@ -0,0 +1,40 @@
+import io
+import os
+
+from actions_toolkit.command import Command
+from actions_toolkit.command_parser import CommandRecord, FileCommandRecord, parse_command_line, parse_commands, \
+    parse_file_commands
+from actions_toolkit.file_command import prepare_key_value_message, prepare_key_value_messages
+
+assert parse_command_line('::debug::hello') == CommandRecord('debug', {}, 'hello')
+assert parse_command_line('::endgroup::\r\n') == CommandRecord('endgroup', {}, '')
+assert parse_command_line('plain output') is None
+assert parse_command_line(':: broken') is None
+
+properties = {'title': 'a: b, c%', 'file': 'root/test.txt', 'line': '5'}
+line = str(Command('error', properties, '100% done\r\n'))
+assert parse_command_line(line) == CommandRecord('error', properties, '100% done\r\n')
+
+log = io.StringIO(f'start\n{line}\nmiddle::text\n  ::warning::indented\n')
+assert list(parse_commands(log)) == [CommandRecord('error', properties, '100% done\r\n'),
+                                     CommandRecord('warning', {}, 'indented')]
+
+contents = ''.join([
+    prepare_key_value_message('out', 'line 1\nline 2') + os.linesep,
+    prepare_key_value_messages({'a': '', 'b': {'json': True}}) + os.linesep,
+    '\n',
+    'plain=key=value\n',
+])
+assert list(parse_file_commands(io.StringIO(contents, newline=''))) == [
+    FileCommandRecord('out', 'line 1\nline 2'),
+    FileCommandRecord('a', ''),
+    FileCommandRecord('b', '{"json": true}'),
+    FileCommandRecord('plain', 'key=value'),
+]
+
+try:
+    list(parse_file_commands(['name<<EOF\n', 'value\n']))
+except ValueError as e:
+    assert str(e) == 'Matching delimiter not found: EOF'
+else:
+    raise Exception('Expected raise ValueError but it did not')
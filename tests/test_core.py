@@ -1,9 +1,19 @@
 import asyncio
+import importlib.util
 import io
 import os
+import pathlib
+import subprocess
 import sys
+import tempfile
+import textwrap
+import time
+import unittest.mock
 
 from actions_toolkit import core
+from actions_toolkit.command import BufferedCommandSink, CommandSink, ThreadedCommandSink, get_command_sink, \
+    set_command_sink
+from actions_toolkit.file_command import use_file_command_pool, flush_file_commands
 from actions_toolkit.utils import to_command_properties, AnnotationProperties
 
 test_env_vars = {
@@ -211,6 +221,9 @@ assert call(core.error, error, title='A title', file='root/test.txt',
             start_column=1, end_column=2, start_line=5, end_line=5) == \
        f'::error title=A title,file=root/test.txt,line=5,endLine=5,col=1,endColumn=2::Error: {message}{os.linesep}'
 
+assert call(core.error, '100% done\r\n', title='a: b, c%', file='root/test.txt', start_line=7) == \
+       f'::error title=a%3A b%2C c%25,file=root/test.txt,line=7,endLine=,col=,endColumn=::100%25 done%0D%0A{os.linesep}'
+
 assert call(core.warning, 'Warning') == f'::warning::Warning{os.linesep}'
 
 assert call(core.warning, '\r\nwarning\n') == f'::warning::%0D%0Awarning%0A{os.linesep}'
@@ -298,3 +311,354 @@ assert core.to_platform_path('') == ''
 assert core.to_platform_path('foo') == 'foo'
 assert core.to_platform_path('foo/bar/baz') == os.sep.join(['foo', 'bar', 'baz'])
 assert core.to_platform_path('foo\\bar\\baz') == os.sep.join(['foo', 'bar', 'baz'])
+
+output = io.StringIO()
+sys.stdout = output
+set_command_sink(BufferedCommandSink(max_bytes=1024, max_delay=60))
+core.info('buffered info')
+core.debug('buffered debug')
+assert output.getvalue() == ''
+core.start_group('buffered group')
+core.end_group()
+assert output.getvalue() == f'buffered info{os.linesep}::debug::buffered debug{os.linesep}' \
+                            f'::group::buffered group{os.linesep}::endgroup::{os.linesep}'
+set_command_sink(BufferedCommandSink(max_bytes=16, max_delay=60))
+core.info('x' * 16)
+assert output.getvalue().endswith(f'{"x" * 16}{os.linesep}')
+core.info('pending')
+assert not output.getvalue().endswith(f'pending{os.linesep}')
+set_command_sink(None)
+assert output.getvalue().endswith(f'pending{os.linesep}')
+
+output = io.StringIO()
+sys.stdout = output
+set_command_sink(BufferedCommandSink(max_bytes=1024, max_delay=0.1))
+core.info('delayed')
+assert output.getvalue() == ''
+time.sleep(0.3)
+assert output.getvalue() == f'delayed{os.linesep}'
+set_command_sink(None)
+sys.stdout = sys.__stdout__
+
+findings = [
+    {'level': 'error', 'message': 'Unused import', 'file': 'a.py', 'start_line': 1, 'start_column': 8},
+    {'level': 'error', 'message': 'Unused import', 'file': 'a.py', 'start_line': 1, 'start_column': 8},
+    {'message': 'Line too long', 'file': 'b.py', 'start_line': 3},
+    {'level': 'notice', 'message': 'a:b'},
+]
+assert call(core.annotate_many, iter(findings)) == \
+       f'::error title=,file=a.py,line=1,endLine=,col=8,endColumn=::Unused import{os.linesep}' \
+       f'::warning title=,file=b.py,line=3,endLine=,col=,endColumn=::Line too long{os.linesep}' \
+       f'::notice::a:b{os.linesep}'
+
+consumed = []
+
+
+def many_findings():
+    for i in range(1000):
+        consumed.append(i)
+        yield {'level': ('error', 'warning', 'notice')[i % 3], 'message': f'finding {i}', 'file': 'c.py'}
+
+
+output = call(core.annotate_many, many_findings(), limit=2)
+assert output.count('::error ') == 2 and output.count('::warning ') == 2 and output.count('::notice ') == 2
+assert len(consumed) == 6
+assert call(core.annotate_many, many_findings(), limit=None, max_tracked=10).count(os.linesep) == 1000
+
+assert call(core.set_secret, 'p4ss:w0rd') == f'::add-mask::p4ss:w0rd{os.linesep}'
+assert call(core.set_secret, 's3cret') == f'::add-mask::s3cret{os.linesep}'
+assert call(core.info, 'token=s3cret, password=p4ss:w0rd') == f'token=***, password=***{os.linesep}'
+assert call(core.warning, 'leaked s3cret\n', title='p4ss:w0rd') == \
+       f'::warning title=***,file=,line=,endLine=,col=,endColumn=::leaked ***%0A{os.linesep}'
+assert core.mask_secrets('s3cretp4ss:w0rd s3cre') == '*** s3cre'
+file_commands = {name: os.environ.pop(f'GITHUB_{name}', None) for name in ('OUTPUT', 'ENV', 'STATE')}
+assert call(core.set_output, 'my out', 's3cret') == f'{os.linesep}::set-output name=my out::s3cret{os.linesep}'
+assert call(core.export_variable, 'my var', 's3cret') == f'::set-env name=my var::s3cret{os.linesep}'
+assert call(core.save_state, 'my val', 's3cret') == f'::save-state name=my val::s3cret{os.linesep}'
+os.environ.update({f'GITHUB_{name}': value for name, value in file_commands.items() if value is not None})
+assert call(core.set_secret, 's3cret') == f'::add-mask::s3cret{os.linesep}'
+
+os.environ.pop('RUNNER_DEBUG', None)
+core._step_debug = None
+formatted = []
+assert call(core.lazy_debug, lambda: formatted.append(1) or 'expensive') == ''
+assert formatted == []
+os.environ['RUNNER_DEBUG'] = '1'
+assert call(core.lazy_debug, 'cached %s', 'off') == ''
+core.set_lazy_debug_always(True)
+assert call(core.lazy_debug, 'value: %s, %d', 'a', 1) == f'::debug::value: a, 1{os.linesep}'
+core.set_lazy_debug_always(False)
+core._step_debug = None
+assert call(core.lazy_debug, lambda: 'expensive') == f'::debug::expensive{os.linesep}'
+assert call(core.lazy_debug, '100%') == f'::debug::100%25{os.linesep}'
+os.environ.pop('RUNNER_DEBUG', None)
+core._step_debug = None
+
+output = io.StringIO()
+sys.stdout = output
+core.enable_async_output(maxsize=8)
+create_file_command_file('OUTPUT')
+for i in range(100):
+    core.info(f'line {i}')
+core.set_output('async out', 'async val')
+core.end_group()
+core.disable_async_output()
+sys.stdout = sys.__stdout__
+assert output.getvalue() == ''.join(f'line {i}{os.linesep}' for i in range(100)) + f'::endgroup::{os.linesep}'
+verify_file_command('OUTPUT', f'async out<<{delimiter}{os.linesep}async val{os.linesep}{delimiter}{os.linesep}')
+
+output = io.StringIO()
+sys.stdout = output
+sink = ThreadedCommandSink(maxsize=1, on_full='drop')
+sink.run(time.sleep, 0.2)
+for i in range(10):
+    sink.write(f'dropped {i}{os.linesep}', droppable=True)
+sink.close()
+sys.stdout = sys.__stdout__
+assert sink.dropped > 0
+assert output.getvalue().count(os.linesep) == 10 - sink.dropped
+
+output = io.StringIO()
+sys.stdout = output
+core.enable_async_output(maxsize=1, on_full='drop')
+get_command_sink().run(time.sleep, 0.2)
+core.info('dropped info')
+core.debug('dropped debug')
+core.set_secret('hunter2')
+core.start_group('kept group')
+core.disable_async_output()
+sys.stdout = sys.__stdout__
+assert get_command_sink().__class__ is CommandSink
+assert f'::add-mask::hunter2{os.linesep}' in output.getvalue()
+assert f'::group::kept group{os.linesep}' in output.getvalue()
+
+sink = ThreadedCommandSink()
+sink.run(open, os.path.join(file_path, 'missing', 'file'))
+try:
+    sink.close()
+except FileNotFoundError:
+    pass
+else:
+    raise Exception('Expected raise FileNotFoundError but it did not')
+
+core.enable_async_output()
+get_command_sink().run(open, os.path.join(file_path, 'missing', 'file'))
+try:
+    core.disable_async_output()
+except FileNotFoundError:
+    pass
+else:
+    raise Exception('Expected raise FileNotFoundError but it did not')
+assert type(get_command_sink()) is CommandSink
+
+use_file_command_pool()
+create_file_command_file('STATE')
+core.save_state('my val', 'c')
+with open(os.path.join(file_path, 'STATE'), 'r', encoding='utf-8') as fs:
+    assert fs.read() == ''
+flush_file_commands()
+use_file_command_pool(False)
+verify_file_command('STATE', f'my val<<{delimiter}{os.linesep}c{os.linesep}{delimiter}{os.linesep}')
+
+command = 'OUTPUT'
+create_file_command_file(command)
+core.set_outputs({'my out': 'out val', 'my two': 2})
+verify_file_command(command, f'my out<<{delimiter}{os.linesep}out val{os.linesep}{delimiter}{os.linesep}'
+                             f'my two<<{delimiter}{os.linesep}2{os.linesep}{delimiter}{os.linesep}')
+
+assert call(core.set_outputs, {'a': 1, 'b': True}) == \
+       f'{os.linesep}::set-output name=a::1{os.linesep}{os.linesep}::set-output name=b::true{os.linesep}'
+
+command = 'ENV'
+create_file_command_file(command)
+core.export_variables({'my var': 'var val', 'my vr2': [1]})
+verify_file_command(command, f'my var<<{delimiter}{os.linesep}var val{os.linesep}{delimiter}{os.linesep}'
+                             f'my vr2<<{delimiter}{os.linesep}[1]{os.linesep}{delimiter}{os.linesep}')
+assert os.getenv('my var') == 'var val' and os.getenv('my vr2') == '[1]'
+
+assert call(core.export_variables, {'bulk var': 5}) == f'::set-env name=bulk var::5{os.linesep}'
+
+assert call(core.save_states, {'state_1': 'v', 'state_2': 2}) == \
+       f'::save-state name=state_1::v{os.linesep}::save-state name=state_2::2{os.linesep}'
+
+assert call(core.set_outputs, {}) == ''
+
+source_path = os.path.join(file_path, 'source.json')
+with open(source_path, 'w', encoding='utf-8', newline='') as fs:
+    fs.write('{"big": "value"}')
+
+command = 'OUTPUT'
+create_file_command_file(command)
+core.set_output_from('my out', pathlib.Path(source_path))
+verify_file_command(command, f'my out<<{delimiter}{os.linesep}{{"big": "value"}}{os.linesep}{delimiter}{os.linesep}')
+
+command = 'STATE'
+create_file_command_file(command)
+core.save_state_from('my val', (chunk for chunk in ['chunk 1,', b' chunk 2']))
+verify_file_command(command, f'my val<<{delimiter}{os.linesep}chunk 1, chunk 2{os.linesep}{delimiter}{os.linesep}')
+
+command = 'ENV'
+create_file_command_file(command)
+core.export_variable_from('my var', b'bytes val')
+verify_file_command(command, f'my var<<{delimiter}{os.linesep}bytes val{os.linesep}{delimiter}{os.linesep}')
+
+create_file_command_file('OUTPUT')
+with unittest.mock.patch('actions_toolkit.file_command.uuid4', return_value=uuid):
+    try:
+        core.set_output_from('my out', ['ok', f'ghadelim', f'iter_{uuid}'])
+    except Exception as e:
+        assert str(e) == f'Unexpected input: value should not contain the delimiter "{delimiter}"'
+    else:
+        raise Exception('Expected raise Exception but it did not')
+verify_file_command('OUTPUT', '')
+
+assert call(core.set_output_from, 'some output', pathlib.Path(source_path)) == \
+       f'{os.linesep}::set-output name=some output::{{"big": "value"}}{os.linesep}'
+os.unlink(source_path)
+
+inputs = core.Inputs({
+    'INPUT_MY_INPUT': ' val ',
+    'INPUT_MY_COUNT': '42',
+    'INPUT_RATIO': '0.5',
+    'INPUT_CONFIG': '{"a": [1, 2]}',
+    'INPUT_MY_LIST': 'a\n b \n\n',
+    'INPUT_MODE': 'fast',
+    'INPUT_BOOLEAN_INPUT': 'True',
+    'INPUT_EMPTY': '',
+    'PATH': '/bin',
+})
+assert 'my input' in inputs and 'empty' not in inputs and 'path' not in inputs
+assert sorted(inputs.names()) == ['BOOLEAN_INPUT', 'CONFIG', 'MODE', 'MY_COUNT', 'MY_INPUT', 'MY_LIST', 'RATIO']
+assert inputs.get('My Input') == 'val'
+assert inputs.get('my input', trim_whitespace=False) == ' val '
+assert inputs.get('missing') == ''
+assert inputs.get_int('my count') == 42
+assert inputs.get_int('missing', default=7) == 7
+assert inputs.get_float('ratio') == 0.5
+assert inputs.get_json('config') == {'a': [1, 2]}
+assert inputs.get_json('config') is inputs.get_json('config')
+assert inputs.get_json('empty', default={'a': 1}) == {'a': 1}
+assert inputs.get_json('empty') is None
+assert inputs.get_list('my list') == ['a', 'b']
+assert inputs.get_list('my list', trim_whitespace=False) == ['a', ' b ']
+assert inputs.get_enum('mode', ['fast', 'slow']) == 'fast'
+assert inputs.get_bool('boolean input') is True
+assert inputs.get_bool('empty', default=False) is False
+
+try:
+    inputs.get('empty', required=True)
+except Exception as e:
+    assert str(e) == 'Input required and not supplied: EMPTY'
+else:
+    raise Exception('Expected raise Exception but it did not')
+
+try:
+    inputs.get_int('ratio')
+except TypeError as e:
+    assert str(e) == 'Input is not a valid integer: ratio'
+else:
+    raise Exception('Expected raise TypeError but it did not')
+
+try:
+    inputs.get_enum('mode', ['slow'])
+except TypeError as e:
+    assert str(e) == 'Input must be one of slow: mode'
+else:
+    raise Exception('Expected raise TypeError but it did not')
+
+assert core.Inputs().get('my input') == core.get_input('my input')
+
+
+def check_load_inputs(tmp_dir: str):
+    action_dir = os.path.join(tmp_dir, 'action')
+    os.makedirs(action_dir)
+    with open(os.path.join(action_dir, 'action.yml'), 'w', encoding='utf-8') as fs:
+        fs.write(textwrap.dedent('''\
+            name: test
+            inputs:
+              token:
+                required: true
+              max-retries:
+                default: 3
+              dry_run:
+                default: false
+              paths:
+                required: false
+              label:
+                default: bug
+            '''))
+    cache_dir = os.path.join(tmp_dir, 'schema-cache')
+    loaded = core.load_inputs(action_dir, types={'max-retries': int, 'dry_run': bool, 'paths': list},
+                              environ={'INPUT_TOKEN': 'abc', 'INPUT_PATHS': 'a\nb'}, cache_dir=cache_dir)
+    assert (loaded.token, loaded.max_retries, loaded.dry_run, loaded.paths, loaded.label) == \
+           ('abc', 3, False, ['a', 'b'], 'bug')
+    assert not hasattr(loaded, '__dict__')
+    assert len(os.listdir(cache_dir)) == 1
+    if hasattr(os, 'getuid'):
+        cache_file = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+        assert os.stat(cache_dir).st_mode & 0o777 == 0o700
+        assert os.stat(cache_file).st_mode & 0o777 == 0o600
+
+    try:
+        core.load_inputs(action_dir, types={'max-retries': int, 'dry_run': bool},
+                         environ={'INPUT_MAX-RETRIES': 'many', 'INPUT_DRY_RUN': 'maybe'}, cache_dir=cache_dir)
+    except Exception as e:
+        assert str(e) == 'Invalid inputs:\n' \
+                         '  Input required and not supplied: TOKEN\n' \
+                         '  Input is not a valid integer: max-retries\n' \
+                         '  Input does not meet YAML 1.2 "Core Schema" specification: dry_run'
+    else:
+        raise Exception('Expected raise Exception but it did not')
+
+    # Without GITHUB_ACTION_PATH, action.yml is looked up next to the script being run
+    script = os.path.join(action_dir, 'main.py')
+    with open(script, 'w', encoding='utf-8') as fs:
+        fs.write('from actions_toolkit import core\n'
+                 'print(core.load_inputs(environ={"INPUT_TOKEN": "abc"}).label)\n')
+    env = {k: v for k, v in os.environ.items() if k != 'GITHUB_ACTION_PATH'}
+    env['PYTHONPATH'] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['TMPDIR'] = tmp_dir
+    proc = subprocess.run([sys.executable, script], cwd=tmp_dir, env=env, stdout=subprocess.PIPE, check=True)
+    assert proc.stdout.decode().strip() == 'bug'
+
+    # A cache directory of another user is neither read nor written
+    if hasattr(os, 'getuid') and os.getuid() == 0:
+        shared_dir = os.path.join(tmp_dir, 'shared-cache')
+        os.makedirs(shared_dir)
+        os.chown(shared_dir, 1, 1)
+        with open(os.path.join(tmp_dir, 'action.yml'), 'w', encoding='utf-8') as fs:
+            fs.write('inputs:\n  token:\n    required: true\n')
+        loaded = core.load_inputs(tmp_dir, environ={'INPUT_TOKEN': 'abc'}, cache_dir=shared_dir)
+        assert loaded.token == 'abc'
+        assert os.listdir(shared_dir) == []
+
+
+# Reading action.yml needs the optional PyYAML dependency
+if importlib.util.find_spec('yaml'):
+    with tempfile.TemporaryDirectory() as tmp:
+        check_load_inputs(tmp)
+
+assert list(core.iter_multiline_input('my input list')) == ['val1', 'val2', 'val3']
+assert list(core.iter_multiline_input('list with trailing whitespace')) == ['val1', 'val2']
+assert list(core.iter_multiline_input('list with trailing whitespace', trim_whitespace=False)) == \
+       ['  val1  ', '  val2  ', '  ']
+os.environ['INPUT_PATH_LIST'] = 'a.py, b.py,,a.py , c.py\n'
+assert list(core.iter_multiline_input('path list', separator=',')) == ['a.py', 'b.py', 'a.py', 'c.py']
+assert list(core.iter_multiline_input('path list', separator=',', dedupe=True)) == ['a.py', 'b.py', 'c.py']
+os.environ['INPUT_PATH_LIST'] = ' a.py\tb.py\n\nc.py  a.py '
+assert list(core.iter_multiline_input('path list', separator=None, dedupe=True)) == ['a.py', 'b.py', 'c.py']
+os.environ.pop('INPUT_PATH_LIST')
+
+try:
+    core.iter_multiline_input('missing', required=True)
+except Exception as e:
+    assert str(e) == 'Input required and not supplied: MISSING'
+else:
+    raise Exception('Expected raise Exception but it did not')
+
+try:
+    core.iter_multiline_input('missing', separator='')
+except ValueError as e:
+    assert str(e) == 'Empty separator'
+else:
+    raise Exception('Expected raise ValueError but it did not')
@@ -0,0 +1,58 @@
+import os
+
+from actions_toolkit.events import Event, IssuesEvent, PullRequestEvent, PushEvent, WorkflowDispatchEvent, \
+    parse_event
+from actions_toolkit.github import CachedContext, Context
+
+os.environ['GITHUB_EVENT_NAME'] = 'issues'
+os.environ['GITHUB_EVENT_PATH'] = os.path.join(os.getcwd(), 'payload.json')
+event = Context().event
+assert isinstance(event, IssuesEvent)
+assert event.action == 'opened'
+assert event.issue.number == 1
+assert event.issue.user is None and event.issue.labels == ()
+assert event.sender.type == 'User'
+assert event.repository.owner.login == event.raw['repository']['owner']['login']
+assert event.issue is event.issue
+assert event.get('missing', 0) == 0
+
+push = parse_event('push', {
+    'ref': 'refs/heads/main',
+    'commits': [{'id': 'a1', 'author': {'name': 'me', 'email': 'me@example.com'}, 'added': ['x.py']},
+                {'id': 'b2'}],
+    'head_commit': None,
+})
+assert isinstance(push, PushEvent)
+assert push.ref == 'refs/heads/main'
+assert [commit.id for commit in push.commits] == ['a1', 'b2']
+assert push.commits[0].author.email == 'me@example.com' and push.commits[0].added == ['x.py']
+assert push.commits[1].author is None
+assert push.head_commit is None and push.sender is None
+
+pull_request = parse_event('pull_request_target', {
+    'action': 'labeled',
+    'number': 3,
+    'pull_request': {'head': {'sha': 'abc', 'repo': {'full_name': 'fork/repo'}}, 'labels': [{'name': 'bug'}]},
+})
+assert isinstance(pull_request, PullRequestEvent)
+assert pull_request.number == 3 and pull_request.pull_request.head.sha == 'abc'
+assert pull_request.pull_request.head.repo.full_name == 'fork/repo'
+assert [label.name for label in pull_request.pull_request.labels] == ['bug']
+assert pull_request.pull_request.base is None
+
+dispatch = parse_event('workflow_dispatch', {'ref': 'refs/heads/main'})
+assert isinstance(dispatch, WorkflowDispatchEvent) and dispatch.inputs == {}
+assert type(parse_event('schedule', {'schedule': '0 0 * * *'})) is Event
+
+try:
+    push.extra = 1
+except AttributeError:
+    pass
+else:
+    raise Exception('Expected raise AttributeError but it did not')
+
+context = CachedContext()
+assert context.event is context.event
+context.event_name = 'push'
+context.payload = {'ref': 'refs/tags/v1'}
+assert isinstance(context.event, PushEvent) and context.event.ref == 'refs/tags/v1'
@@ -1,7 +1,8 @@
 import json
 import os
 
-from actions_toolkit.github import Context, Repo, Issue
+from actions_toolkit.github import Context, CachedContext, Repo, Issue, get_context
+from actions_toolkit.json_scan import extract_paths
 
 os.environ['GITHUB_REPOSITORY'] = 'yanglbme/actions-toolkit'
 os.environ['GITHUB_EVENT_PATH'] = os.path.join(os.getcwd(), 'payload.json')
@@ -55,3 +56,54 @@ context.payload = {
     }
 }
 assert context.issue == Issue(owner='user', repo='test', number=2)
+
+os.environ['GITHUB_EVENT_PATH'] = os.path.join(os.getcwd(), 'payload.json')
+context = Context()
+assert context.extract('issue.number', 'repository.owner.login', 'missing.path') == \
+       {'issue.number': 1, 'repository.owner.login': 'user'}
+assert context.extract('issue', 'issue.number') == {'issue': {'number': 1}, 'issue.number': 1}
+assert context._payload is None
+assert context.payload['action'] == 'opened'
+assert context.extract('sender.type', 'repository.name') == {'sender.type': 'User', 'repository.name': 'test'}
+
+big_payload = json.dumps({
+    'ref': 'refs/heads/main',
+    'commits': [{'id': str(i), 'message': 'fix "quotes" \\ and {braces}', 'added': []} for i in range(100)],
+    'numbers': {'0': 'zero'},
+    'head_commit': {'id': '99'}
+})
+assert extract_paths(big_payload, ['head_commit.id', 'commits.3.id', 'numbers.0', 'commits.200.id']) == \
+       {'head_commit.id': '99', 'commits.3.id': '3', 'numbers.0': 'zero'}
+assert extract_paths('[]', ['a']) == {}
+
+os.environ['GITHUB_REPOSITORY'] = 'yanglbme/actions-toolkit'
+os.environ['GITHUB_EVENT_PATH'] = os.path.join(os.getcwd(), 'payload.json')
+assert Context().get('repository.owner.login') == 'user'
+assert Context().get('issue.title', 'none') == 'none'
+
+context = get_context()
+assert context is get_context()
+assert context.repo is context.repo
+assert context.issue == Issue(owner='yanglbme', repo='actions-toolkit', number=1)
+assert context.get('repository.owner.login') == 'user'
+assert context.get('issue') == {'number': 1}
+assert context.get('issue.title') is None
+
+context = CachedContext()
+context.payload = {'pull_request': {'number': 3, 'labels': [{'name': 'bug'}]}}
+assert context.issue.number == 3
+assert context.get('pull_request.labels.0.name') == 'bug'
+context.payload = {'issue': {'number': 4}}
+assert context.issue.number == 4
+assert context.get('pull_request.number', 0) == 0
+
+os.environ['GITHUB_EVENT_PATH'] = os.path.join(os.getcwd(), 'missing-payload.json')
+context = Context()
+for _ in range(2):
+    try:
+        context.payload
+    except FileNotFoundError:
+        pass
+    else:
+        raise Exception('Expected raise FileNotFoundError but it did not')
+os.environ['GITHUB_EVENT_PATH'] = os.path.join(os.getcwd(), 'payload.json')
@@ -0,0 +1,19 @@
+import os
+import subprocess
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def check_lazy_imports(module: str):
+    code = f'import sys, {module}; print(",".join(m for m in ("requests", "github", "yaml") if m in sys.modules))'
+    proc = subprocess.run([sys.executable, '-c', code], cwd=root, stdout=subprocess.PIPE, check=True)
+    assert proc.stdout.decode().strip() == '', f'{module} imported {proc.stdout.decode().strip()}'
+
+
+for module in ('actions_toolkit.core', 'actions_toolkit.github', 'actions_toolkit.cache'):
+    check_lazy_imports(module)
+
+proc = subprocess.run([sys.executable, 'benchmarks/bench_import.py', '--runs', '1', 'actions_toolkit.core'],
+                      cwd=root, stdout=subprocess.PIPE, env=dict(os.environ, PYTHONPATH=root))
+assert proc.returncode == 0, proc.stdout.decode()
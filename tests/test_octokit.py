@@ -0,0 +1,359 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from actions_toolkit.http_cache import HTTPCache
+from actions_toolkit.github import GraphQLBatcher, PreparedQuery, RateLimitScheduler, get_async_octokit, get_octokit, \
+    prepare_query
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Stand-in for the GitHub API: replies with the queued responses, then with an empty 200"""
+    protocol_version = 'HTTP/1.1'
+    responses = []
+    received = []
+    delay = 0
+
+    def _reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        Handler.received.append({
+            'method': self.command,
+            'path': self.path,
+            'headers': dict(self.headers),
+            'body': json.loads(body) if body else None,
+            'port': self.client_address[1],
+        })
+        time.sleep(Handler.delay)
+        status, headers, payload = Handler.responses.pop(0) if Handler.responses else (200, {}, {'data': {}})
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        if status == 304:
+            data = b''
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+def reset(*responses):
+    Handler.responses = list(responses)
+    Handler.received = []
+
+
+server = Server(('127.0.0.1', 0), Handler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+base_url = f'http://127.0.0.1:{server.server_address[1]}'
+
+os.environ['GITHUB_GRAPHQL_URL'] = f'{base_url}/api/graphql'
+octokit = get_octokit('token', backoff_factor=0.01)
+assert octokit.graphql_url == f'{base_url}/api/graphql'
+
+reset((200, {}, {'data': {'viewer': {'login': 'octocat'}}}))
+assert octokit.graphql('query { viewer { login } }', {}) == {'data': {'viewer': {'login': 'octocat'}}}
+assert Handler.received[0]['path'] == '/api/graphql'
+assert Handler.received[0]['headers']['Authorization'] == 'Bearer token'
+assert Handler.received[0]['body'] == {'query': 'query { viewer { login } }'}
+
+reset()
+for _ in range(5):
+    octokit.graphql('query { viewer { login } }', {})
+assert len({r['port'] for r in Handler.received}) == 1
+
+reset((502, {}, {}), (403, {'Retry-After': '0'}, {'message': 'You have exceeded a secondary rate limit'}),
+      (200, {}, {'data': {'ok': True}}))
+assert octokit.graphql('query { ok }', {}) == {'data': {'ok': True}}
+assert len(Handler.received) == 3
+
+reset((403, {}, {'message': 'Resource not accessible by integration'}))
+try:
+    octokit.graphql('query { ok }', {})
+except Exception as e:
+    assert str(e) == 'Query failed to run by returning code of 403. query { ok }'
+else:
+    raise Exception('Expected raise Exception but it did not')
+assert len(Handler.received) == 1
+
+reset(*[(500, {}, {})] * 10)
+assert octokit.request('GET', f'{base_url}/rate_limit').status_code == 500
+assert len(Handler.received) == 4
+Handler.responses = []
+
+os.environ.pop('GITHUB_GRAPHQL_URL')
+assert get_octokit('token').graphql_url == 'https://api.github.com/graphql'
+
+
+def issues_page(numbers, cursor):
+    return 200, {}, {'data': {'repository': {'issues': {
+        'nodes': [{'number': n} for n in numbers],
+        'pageInfo': {'hasNextPage': cursor is not None, 'endCursor': cursor},
+    }}}}
+
+
+query = 'query { repository(owner: "$owner", name: "a") { issues(first: 2, after: $cursor) { ' \
+        'nodes { number } pageInfo { hasNextPage endCursor } } } }'
+octokit = get_octokit('token', graphql_url=f'{base_url}/graphql')
+for prefetch in (False, True):
+    reset(issues_page([1, 2], 'c1'), issues_page([3, 4], 'c2'), issues_page([5], None))
+    nodes = octokit.paginate_graphql(query, {'owner': 'me'}, 'repository.issues', prefetch=prefetch)
+    assert [node['number'] for node in nodes] == [1, 2, 3, 4, 5]
+    assert [r['body']['query'].split('after: ')[1].split(')')[0] for r in Handler.received] == \
+           ['null', '"c1"', '"c2"']
+    assert 'owner: "me"' in Handler.received[0]['body']['query']
+
+query = """
+query($owner: String!, $cursor: String) {
+  # the cursor comes last
+  repository(owner: $owner, name: "a  b") {
+    issues(first: 2, after: $cursor) { nodes { number } pageInfo { hasNextPage endCursor } }
+  }
+}"""
+reset(issues_page([1, 2], 'c1'), issues_page([3], None))
+assert [node['number'] for node in octokit.paginate_graphql(query, {'owner': 'me$"'}, 'repository.issues')] == [1, 2, 3]
+assert [r['body']['variables'] for r in Handler.received] == [{'owner': 'me$"', 'cursor': None},
+                                                                {'owner': 'me$"', 'cursor': 'c1'}]
+assert Handler.received[0]['body']['query'] == \
+       'query($owner: String! $cursor: String) { repository(owner: $owner name: "a  b") { ' \
+       'issues(first: 2 after: $cursor) { nodes { number } pageInfo { hasNextPage endCursor } } } }'
+assert prepare_query(query) is prepare_query(query)
+assert prepare_query(query).variables == {'owner', 'cursor'}
+assert prepare_query(query).sha256 == PreparedQuery('\n' + query + '\n\n').sha256
+
+reset((200, {}, {'data': {'viewer': {'login': 'octocat'}}}))
+assert octokit.graphql(PreparedQuery('{ viewer { login } }'))['data'] == {'viewer': {'login': 'octocat'}}
+assert Handler.received[0]['body'] == {'query': '{ viewer { login } }', 'variables': {}}
+
+reset((200, {}, {'data': {'repository': {'issues': {
+    'edges': [{'node': {'number': 7}}], 'pageInfo': {'hasNextPage': False, 'endCursor': None}}}}}))
+assert list(octokit.paginate_graphql(query, {'owner': 'me'}, 'repository.issues')) == [{'number': 7}]
+
+reset((200, {}, {'errors': [{'message': 'Bad credentials'}]}))
+try:
+    list(octokit.paginate_graphql(query, {'owner': 'me'}, 'repository.issues'))
+except Exception as e:
+    assert str(e) == 'Query failed with errors: [{"message": "Bad credentials"}]'
+else:
+    raise Exception('Expected raise Exception but it did not')
+
+reset((200, {}, {'data': {'q0': {'stargazerCount': 1}, 'q1': None},
+                 'errors': [{'path': ['q1'], 'message': 'Could not resolve to a Repository'}]}),
+      (200, {}, {'data': {'q0': {'stargazerCount': 3}}}))
+with GraphQLBatcher(octokit, max_batch_size=2) as batcher:
+    futures = [batcher.submit(f'repository(owner: "me", name: "r{i}") {{ stargazerCount }}') for i in range(3)]
+    assert len(Handler.received) == 1
+assert len(Handler.received) == 2
+assert Handler.received[0]['body']['query'] == 'query {\n' \
+                                               '  q0: repository(owner: "me", name: "r0") { stargazerCount }\n' \
+                                               '  q1: repository(owner: "me", name: "r1") { stargazerCount }\n}'
+assert futures[0].result() == {'stargazerCount': 1}
+assert futures[2].result() == {'stargazerCount': 3}
+try:
+    futures[1].result()
+except Exception as e:
+    assert 'Could not resolve to a Repository' in str(e)
+else:
+    raise Exception('Expected raise Exception but it did not')
+
+reset()
+batcher = GraphQLBatcher(octokit, max_nodes=100)
+batcher.submit('viewer { login }', nodes=60)
+batcher.submit('viewer { name }', nodes=60)
+assert len(Handler.received) == 1
+batcher.flush()
+assert len(Handler.received) == 2
+
+with tempfile.TemporaryDirectory() as cache_dir:
+    cache = HTTPCache(cache_dir)
+    octokit = get_octokit('token', graphql_url=f'{base_url}/graphql', cache=cache)
+    reset((200, {'ETag': '"v1"', 'X-RateLimit-Remaining': '99'}, {'name': 'r'}),
+          (304, {'X-RateLimit-Remaining': '98'}, {}),
+          (200, {'ETag': '"v2"'}, {'name': 'renamed'}))
+    resp = octokit.request('GET', f'{base_url}/repos/me/r', params={'a': 1})
+    assert resp.json() == {'name': 'r'} and not getattr(resp, 'from_cache', False)
+    resp = octokit.request('GET', f'{base_url}/repos/me/r', params={'a': 1})
+    assert resp.json() == {'name': 'r'} and resp.from_cache and resp.status_code == 200
+    assert resp.headers['X-RateLimit-Remaining'] == '98' and resp.headers['ETag'] == '"v1"'
+    assert Handler.received[1]['headers']['If-None-Match'] == '"v1"'
+    assert octokit.request('GET', f'{base_url}/repos/me/r', params={'a': 1}).json() == {'name': 'renamed'}
+    assert Handler.received[2]['headers']['If-None-Match'] == '"v1"'
+
+    # Another token, or another cache instance over the same directory
+    reset((200, {'ETag': '"v3"'}, {'name': 'other'}), (304, {}, {}))
+    other = get_octokit('other token', graphql_url=f'{base_url}/graphql', cache=HTTPCache(cache_dir))
+    assert other.request('GET', f'{base_url}/repos/me/r', params={'a': 1}).json() == {'name': 'other'}
+    assert 'If-None-Match' not in Handler.received[0]['headers']
+    octokit = get_octokit('token', graphql_url=f'{base_url}/graphql', cache=HTTPCache(cache_dir))
+    assert octokit.request('GET', f'{base_url}/repos/me/r?a=1').json() == {'name': 'renamed'}
+    assert Handler.received[1]['headers']['If-None-Match'] == '"v2"'
+
+    # Responses without validators are not kept, the least recently used ones are evicted
+    cache.clear()
+    cache = HTTPCache(cache_dir, max_entries=2)
+    octokit = get_octokit('token', graphql_url=f'{base_url}/graphql', cache=cache)
+    reset((200, {}, {}), *[(200, {'ETag': f'"{i}"'}, {}) for i in range(3)])
+    for path in ('plain', 'a', 'b', 'c'):
+        octokit.request('GET', f'{base_url}/{path}')
+    assert len(os.listdir(cache_dir)) == 2
+    reset()
+    for path in ('b', 'c', 'a'):
+        octokit.request('GET', f'{base_url}/{path}')
+    assert ['If-None-Match' in r['headers'] for r in Handler.received] == [True, True, False]
+
+    if hasattr(os, 'getuid'):
+        assert os.stat(cache_dir).st_mode & 0o777 == 0o700
+        assert all(os.stat(os.path.join(cache_dir, name)).st_mode & 0o777 == 0o600 for name in os.listdir(cache_dir))
+
+if hasattr(os, 'getuid'):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.chmod(cache_dir, 0o755)
+        HTTPCache(cache_dir)._is_private()
+        assert os.stat(cache_dir).st_mode & 0o777 == 0o700
+        if os.getuid() == 0:
+            # A directory of another user is not used
+            os.chown(cache_dir, 1, 1)
+            octokit = get_octokit('token', graphql_url=f'{base_url}/graphql', cache=HTTPCache(cache_dir))
+            reset((200, {'ETag': '"v1"'}, {}))
+            octokit.request('GET', f'{base_url}/repos/me/r')
+            assert os.listdir(cache_dir) == []
+
+scheduler = RateLimitScheduler(max_concurrency=2)
+in_flight = []
+peak = []
+
+
+def check_slot():
+    with scheduler.slot():
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        time.sleep(0.02)
+        in_flight.pop()
+
+
+threads = [threading.Thread(target=check_slot) for _ in range(8)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+assert max(peak) == 2
+assert scheduler.metrics['requests'] == 8 and scheduler.metrics['in_flight'] == 0
+assert scheduler.metrics['delayed'] > 0
+
+scheduler = RateLimitScheduler(rate=50)
+start = time.monotonic()
+for _ in range(5):
+    with scheduler.slot():
+        pass
+assert time.monotonic() - start >= 0.07
+
+# Waiting requests go by priority
+scheduler = RateLimitScheduler(max_concurrency=1)
+order = []
+scheduler.acquire()
+threads = [threading.Thread(target=lambda p=p: (scheduler.acquire(priority=p), order.append(p), scheduler.release()))
+           for p in (5, 1, 3)]
+for thread in threads:
+    thread.start()
+    time.sleep(0.02)
+scheduler.release()
+for thread in threads:
+    thread.join()
+assert order == [1, 3, 5]
+
+# The budget reported by GitHub is respected
+scheduler = RateLimitScheduler(max_wait=0.5)
+octokit = get_octokit('token', graphql_url=f'{base_url}/graphql', scheduler=scheduler)
+reset((200, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(int(time.time()) + 60),
+             'X-RateLimit-Resource': 'search'}, {}))
+octokit.request('GET', f'{base_url}/search/issues')
+assert scheduler.metrics['remaining'] == {'search': 0}
+octokit.request('GET', f'{base_url}/repos/me/r')
+try:
+    octokit.request('GET', f'{base_url}/search/issues')
+except Exception as e:
+    assert str(e) == 'Rate limited: a search request would wait more than 0.5 seconds'
+else:
+    raise Exception('Expected raise Exception but it did not')
+
+# A request held back by its resource does not hold back the others
+scheduler = RateLimitScheduler(max_wait=5)
+octokit = get_octokit('token', graphql_url=f'{base_url}/graphql', scheduler=scheduler)
+reset((200, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(int(time.time()) + 2),
+             'X-RateLimit-Resource': 'search'}, {}))
+octokit.request('GET', f'{base_url}/search/issues')
+blocked = threading.Thread(target=octokit.request, args=('GET', f'{base_url}/search/issues'))
+blocked.start()
+time.sleep(0.05)
+start = time.monotonic()
+octokit.request('GET', f'{base_url}/repos/me/r', priority=1)
+assert time.monotonic() - start < 0.5
+assert [r['path'] for r in Handler.received] == ['/search/issues', '/repos/me/r']
+blocked.join()
+assert [r['path'] for r in Handler.received] == ['/search/issues', '/repos/me/r', '/search/issues']
+
+scheduler = RateLimitScheduler()
+octokit = get_octokit('token', graphql_url=f'{base_url}/graphql', scheduler=scheduler, backoff_factor=0)
+reset((429, {'Retry-After': '1'}, {}), (200, {}, {'data': {'ok': True}}))
+start = time.monotonic()
+assert octokit.graphql('query { ok }') == {'data': {'ok': True}}
+assert time.monotonic() - start >= 0.9
+assert scheduler.metrics['requests'] == 2
+
+
+async def check_fan_out():
+    async with get_async_octokit('token', graphql_url=f'{base_url}/graphql', max_concurrency=4,
+                                 scheduler=RateLimitScheduler(max_concurrency=100)) as client:
+        start = time.monotonic()
+        responses = await asyncio.gather(*[client.request('GET', f'{base_url}/pulls/{i}') for i in range(8)])
+        elapsed = time.monotonic() - start
+        assert all(resp.status_code == 200 for resp in responses)
+        assert sorted(r['path'] for r in Handler.received) == sorted(f'/pulls/{i}' for i in range(8))
+        assert 0.1 <= elapsed < 0.3
+
+        reset(issues_page([1, 2], 'c1'), issues_page([3], None))
+        nodes = [node['number'] async for node in client.paginate_graphql(query, {'owner': 'me'}, 'repository.issues')]
+        assert nodes == [1, 2, 3]
+        assert [r['body']['variables']['cursor'] for r in Handler.received] == [None, 'c1']
+
+
+async def check_cancel(**options):
+    client = get_async_octokit('token', graphql_url=f'{base_url}/graphql', **options)
+    tasks = [asyncio.ensure_future(client.graphql('{ viewer { login } }')) for _ in range(30)]
+    await asyncio.sleep(0.02)
+    for task in tasks:
+        task.cancel()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    await asyncio.sleep(0.2)
+    assert len(Handler.received) == client.max_concurrency, len(Handler.received)
+    client.close()
+
+
+reset()
+Handler.delay = 0.05
+asyncio.run(check_fan_out())
+reset()
+asyncio.run(check_cancel(max_concurrency=1, scheduler=RateLimitScheduler(max_concurrency=100)))
+# With the shared scheduler, which admits 10 requests at once
+assert get_async_octokit('token', graphql_url=f'{base_url}/graphql').max_concurrency == 10
+reset()
+asyncio.run(check_cancel())
+Handler.delay = 0
+
+assert octokit.rest is octokit.rest and type(octokit.rest).__name__ == 'Github'
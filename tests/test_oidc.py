@@ -0,0 +1,90 @@
+import asyncio
+import base64
+import io
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from actions_toolkit import core
+from actions_toolkit.oidc_utils import IdTokenCache, get_id_token_cache, token_expiry
+
+
+def make_token(exp, audience):
+    claims = base64.urlsafe_b64encode(json.dumps({'aud': audience, 'exp': exp}).encode()).decode().rstrip('=')
+    return f'e30.{claims}.sig'
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Stand-in for the OIDC provider, issues tokens valid for Handler.lifetime seconds"""
+    lifetime = 600
+    requests = []
+
+    def do_GET(self):
+        Handler.requests.append(self.path)
+        time.sleep(0.05)
+        audience = self.path.partition('audience=')[2] or 'default'
+        data = json.dumps({'value': make_token(int(time.time()) + Handler.lifetime, audience)}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+server = Server(('127.0.0.1', 0), Handler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+os.environ['ACTIONS_ID_TOKEN_REQUEST_URL'] = f'http://127.0.0.1:{server.server_address[1]}/token?api-version=2.0'
+os.environ['ACTIONS_ID_TOKEN_REQUEST_TOKEN'] = 'request-token'
+
+assert token_expiry(make_token(1700000000, 'a')) == 1700000000
+assert token_expiry('not a jwt') is None
+
+output = io.StringIO()
+sys.stdout = output
+tokens = [core.get_id_token('sts') for _ in range(3)] + [core.get_id_token()]
+sys.stdout = sys.__stdout__
+assert len(Handler.requests) == 2
+assert tokens[0] == tokens[1] == tokens[2] != tokens[3]
+assert output.getvalue().count('::add-mask::') == 2
+
+# Concurrent callers share one request per audience
+Handler.requests = []
+cache = IdTokenCache()
+results = []
+threads = [threading.Thread(target=lambda: results.append(cache.get('aws'))) for _ in range(8)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+assert len(Handler.requests) == 1 and len(set(results)) == 1
+
+
+async def check_tasks():
+    return await asyncio.gather(*[cache.get_async(audience) for audience in ('gcp', 'gcp', 'gcp', 'azure')])
+
+
+Handler.requests = []
+results = asyncio.run(check_tasks())
+assert sorted(Handler.requests) == ['/token?api-version=2.0&audience=azure', '/token?api-version=2.0&audience=gcp']
+assert results[0] == results[1] == results[2] != results[3]
+
+# Tokens about to expire are replaced
+Handler.requests = []
+Handler.lifetime = 30
+cache = IdTokenCache(refresh_margin=60)
+cache.get('short')
+cache.get('short')
+assert len(Handler.requests) == 2
+
+assert get_id_token_cache() is get_id_token_cache()
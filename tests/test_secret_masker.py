@@ -0,0 +1,19 @@
+from actions_toolkit.secret_masker import SecretMasker
+
+masker = SecretMasker()
+assert masker.mask('nothing registered') == 'nothing registered'
+
+assert masker.add('abc') is True
+assert masker.add('abc') is False
+assert masker.add('') is False
+assert 'abc' in masker
+assert masker.mask('xabcx abc') == 'x***x ***'
+
+masker = SecretMasker(['bcd', 'abcde', 'c'])
+assert masker.mask('abcdef') == '***f'
+assert masker.mask('xbcdx c') == 'x***x ***'
+assert masker.mask('ccc') == '***'
+
+masker = SecretMasker(['he', 'she', 'his', 'hers'], replacement='#')
+assert masker.mask('ushers') == 'u#'
+assert masker.mask('this is his') == 't# is #'